@@ -21,8 +21,11 @@ all dark tifs and raw tifs are ignored as they are being read in.
 
 from tifffile import imread
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
 
+from xpdview.utils import directory_index
+
 
 class TifFileFinder(object):
     """
@@ -32,15 +35,16 @@ class TifFileFinder(object):
     ----------
     _directory_name : str
         The name of directory that contains tif files that user wants to see
-    dir_fil : list of strings
-        list of all files in directory
     file_list : list of strings
-        list of all tif files in directory
+        list of all tif files in directory, in the order they were found
     pic_list : list of 2D numpy arrays
         list of all data read in from the tif files
+    n_workers : int or None
+        number of threads decoding new files, None to decode them one
+        after the other
     """
 
-    def __init__(self, is_callback=False):
+    def __init__(self, is_callback=False, n_workers=None):
         """
         This initializes the TifFileFinder class
 
@@ -48,16 +52,21 @@ class TifFileFinder(object):
         ----------
         is_callback : bool, optional
             option to run in callback mode
+        n_workers : int, optional
+            number of threads decoding new files. default to None, reading
+            them in the calling thread
         Returns
         -------
         None
         """
         self._directory_name = None
-        self.dir_fil = []
         self.file_list = []
+        self._file_set = set()
         self.pic_list = []
         self.array_dict = OrderedDict()
         self.is_callback = is_callback
+        self.n_workers = n_workers
+        self._executor = None
 
     def get_file_list(self):
         """
@@ -72,22 +81,49 @@ class TifFileFinder(object):
         None
 
         """
-        try:
-            if self._directory_name is None:
-                raise NotADirectoryError
-            if self._directory_name[-1] != '/' or '\\':
-                self._directory_name += '/'
-            self.dir_fil = os.listdir(self._directory_name)
-            self.dir_fil.sort(key=lambda x: os.path.getmtime(self._directory_name + x))
-            self.file_list = [file for file in self.dir_fil if file.endswith('.tif') and not
-                              (file.endswith('.dark.tif') or file.endswith('.raw.tif'))]
-            self.get_image_arrays()
-        except IndexError:
-            pass
+        if self._directory_name is None:
+            raise NotADirectoryError
+        self.file_list = []
+        self._file_set = set()
+        self.pic_list = []
+        self.get_image_arrays()
+
+    def _find_new_files(self):
+        """
+        This method lists the tif files not seen yet, oldest first
+
+        Only the new files are looked up with a stat call, dark and raw
+        tifs are ignored.
+
+        Returns
+        -------
+        new_file_list : list of strings
+            names of the new files
+        """
+        index = directory_index(self._directory_name)
+        new_file_list = [
+            file for file in index.names('.tif')
+            if file not in self._file_set and
+            not file.endswith(('.dark.tif', '.raw.tif'))]
+        new_file_list.sort(key=lambda x: os.path.getmtime(
+            os.path.join(self._directory_name, x)))
+        self.file_list.extend(new_file_list)
+        self._file_set.update(new_file_list)
+        return new_file_list
+
+    def _read(self, file_names):
+        """read files once each, in order, possibly in threads"""
+        paths = [os.path.join(self._directory_name, i) for i in file_names]
+        if not self.n_workers or len(paths) < 2:
+            return [imread(path) for path in paths]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.n_workers)
+        return list(self._executor.map(imread, paths))
 
     def get_image_arrays(self):
         """
-        This method reads in the tif files into 2D numpy arrays and appends them to the class's pic_list
+        This method reads in the tif files not read yet into 2D numpy arrays and appends them to the
+        class's pic_list
 
         Parameters
         ----------
@@ -98,8 +134,7 @@ class TifFileFinder(object):
         None
 
         """
-        for i in self.file_list:
-            self.pic_list.append(imread(self._directory_name + i))
+        self.get_new_images(self._find_new_files())
 
     def get_new_files(self, array_dict=None):
         """
@@ -119,23 +154,9 @@ class TifFileFinder(object):
         if self.is_callback:
             # method tailored to callback, holds name and array
             self.array_dict.update(array_dict)
-            return list(array_dict.keys(), array_dict.values())
+            return list(array_dict.keys()), list(array_dict.values())
         else:
-            self.dir_fil = os.listdir(self._directory_name)
-            self.dir_fil.sort(key=lambda x: os.path.getmtime(self._directory_name + x))
-            new_file_list = [file for file in self.dir_fil if file.endswith('.tif') and not (file.endswith('.dark.tif') or
-                                                                                             file.endswith('.raw.tif'))]
-            need_read_files = []
-            for i in new_file_list:
-                add = True
-                for j in self.file_list:
-                    if i == j:
-                        add = False
-                        break
-                if add:
-                    self.file_list.append(i)
-                    need_read_files.append(i)
-            return self.get_new_images(need_read_files)
+            return self.get_new_images(self._find_new_files())
 
     def get_new_images(self, temp_file_list):
         """
@@ -157,7 +178,6 @@ class TifFileFinder(object):
         """
         new_pics = []
         if temp_file_list is not None:
-            for i in temp_file_list:
-                self.pic_list.append(imread(self._directory_name + i))
-                new_pics.append(imread(self._directory_name + i))
+            new_pics = self._read(temp_file_list)
+            self.pic_list.extend(new_pics)
         return temp_file_list, new_pics
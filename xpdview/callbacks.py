@@ -1,3 +1,5 @@
+import time
+
 import matplotlib.pyplot as plt
 from bluesky.callbacks.core import CallbackBase
 
@@ -7,15 +9,36 @@ from .waterfall import Waterfall
 class LiveWaterfall(CallbackBase):
     """
     Stream 1D line data in a waterfall viewer.
+
+    Parameters
+    ----------
+    max_fps : float, optional
+        maximum number of waterfall redraws per second. If given, events
+        are buffered and flushed to the waterfall at most this often.
+        There is no timer: buffered events are only drawn with a later
+        event or at ``stop``, so a paused scan may show stale data.
+        default to None (redraw on every event)
+    batch_size : int, optional
+        number of buffered events which forces a flush, regardless of
+        ``max_fps``. default to None
+    max_curves : int, optional
+        maximum number of curves shown by each waterfall, older curves
+        are dropped. default to None (keep all)
     """
 
-    def __init__(self):
+    def __init__(self, *, max_fps=None, batch_size=None, max_curves=None):
         super().__init__()
         self.wfs = {}
         self.units = None
         self.in_dep_shapes = {}
         self.dim_names = {}
         self.dep_shapes = {}
+        self.max_fps = max_fps
+        self.batch_size = batch_size
+        self.max_curves = max_curves
+        # events waiting to be drawn, {waterfall: (key_list, int_data_list)}
+        self._pending = {}
+        self._last_flush = {}
 
     def start(self, doc):
         dimensions = doc.get("hints", {}).get("dimensions", [])
@@ -51,9 +74,12 @@ class LiveWaterfall(CallbackBase):
                                 f"{one_d_dep_var} ({doc['data_keys'][one_d_dep_var].get('units','arb')})"
                             ),
                         ),
+                        max_curves=self.max_curves,
                     )
                 else:
-                    self.wfs[(one_d_ind_var, one_d_dep_var)].clear()
+                    wf = self.wfs[(one_d_ind_var, one_d_dep_var)]
+                    self._pending.pop(wf, None)
+                    wf.clear()
 
     def event(self, doc):
         super().event(doc)
@@ -73,5 +99,36 @@ class LiveWaterfall(CallbackBase):
                         doc["seq_num"],
                     )
 
+    def stop(self, doc):
+        self.flush()
+        super().stop(doc)
+
     def update(self, data, wf, i):
-        wf.update(key_list=[i], int_data_list=[data])
+        if self.max_fps is None and self.batch_size is None:
+            wf.update(key_list=[i], int_data_list=[data])
+            return
+        key_list, int_data_list = self._pending.setdefault(wf, ([], []))
+        key_list.append(i)
+        int_data_list.append(data)
+        if self.batch_size is not None and len(key_list) >= self.batch_size:
+            self.flush(wf)
+        elif self.max_fps is not None and (
+            time.monotonic() - self._last_flush.get(wf, 0.)
+            >= 1. / self.max_fps
+        ):
+            self.flush(wf)
+
+    def flush(self, wf=None):
+        """draw buffered events
+
+        Parameters
+        ----------
+        wf : Waterfall, optional
+            waterfall to flush. default to None, which flushes all of them
+        """
+        wfs = list(self._pending) if wf is None else [wf]
+        for wf in wfs:
+            key_list, int_data_list = self._pending.pop(wf, ([], []))
+            if key_list:
+                wf.update(key_list=key_list, int_data_list=int_data_list)
+            self._last_flush[wf] = time.monotonic()
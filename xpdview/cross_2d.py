@@ -7,8 +7,168 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib.ticker import NullLocator, LinearLocator
 from matplotlib.colors import Normalize
 from matplotlib.widgets import Slider
+from matplotlib.transforms import Bbox
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import numpy as np
 
+from xpdview.utils import read_image
+from xpdview.frame_stats import frame_stats
+
+# default memory limit of decoded frames cached by StackViewer, in bytes
+CACHE_SIZE = 2 ** 30
+# default number of memory-mapped frames cached by StackViewer, each one
+# holds a file descriptor
+MAPPED_FRAMES = 128
+# default number of pixels sampled by approximate limit functions
+SAMPLE_SIZE = 2 ** 18
+# smallest side of the coarsest level of image pyramids
+PYRAMID_MIN_SIZE = 256
+# statistics read by the default limit function, computed while prefetching
+LIMIT_STATS = ('min', 'max')
+
+
+def subsample(image, max_pixels=SAMPLE_SIZE):
+    """strided view of ``image`` with at most about ``max_pixels`` pixels
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image
+    max_pixels : int, optional
+        number of pixels to keep. default to SAMPLE_SIZE
+
+    Returns
+    -------
+    sample : ndarray
+        a view of the image, no data is copied
+    """
+    stride = int(np.ceil(np.sqrt(image.size / max_pixels)))
+    if stride <= 1:
+        return image
+    return image[::stride, ::stride]
+
+
+def pyramid(image, min_size=PYRAMID_MIN_SIZE):
+    """downsampled copies of an image, halving the size at every level
+
+    Blocks of 2x2 pixels are averaged, the last row or column is dropped
+    when the size is odd.
+
+    Parameters
+    ----------
+    image : ndarray
+        2D image
+    min_size : int, optional
+        levels are added while their smallest side is at least this size.
+        default to PYRAMID_MIN_SIZE
+
+    Returns
+    -------
+    levels : list
+        the image followed by the downsampled levels
+    """
+    levels = [image]
+    while min(levels[-1].shape) >= 2 * min_size:
+        level = levels[-1]
+        rows, cols = level.shape[0] // 2 * 2, level.shape[1] // 2 * 2
+        level = level[:rows, :cols]
+        # sum in float, integer images would overflow
+        block = level[::2, ::2].astype(np.float32)
+        for view in (level[1::2, ::2], level[::2, 1::2], level[1::2, 1::2]):
+            block += view
+        block /= 4
+        levels.append(block)
+    return levels
+
+
+def pyramid_depth(shape, min_size=PYRAMID_MIN_SIZE):
+    """number of levels ``pyramid`` returns for an image of this shape"""
+    side, depth = min(shape), 1
+    while side >= 2 * min_size:
+        side //= 2
+        depth += 1
+    return depth
+
+
+def fullrange_limit_factory(max_pixels=None):
+    """limit function returning the min and max of the image
+
+    Parameters
+    ----------
+    max_pixels : int, optional
+        if given, only a strided subsample of about this many pixels is
+        searched, which may miss isolated extreme pixels. Otherwise the
+        values are shared through ``frame_stats``. default to None
+
+    Returns
+    -------
+    limit_func : callable
+        function taking an image and returning (vmin, vmax)
+    """
+    def _limit_func(image):
+        if max_pixels:
+            image = subsample(image, max_pixels)
+            return image.min(), image.max()
+        return tuple(frame_stats.get(image, stat) for stat in LIMIT_STATS)
+    return _limit_func
+
+
+def percentile_limit_factory(limit_args=(1, 99), max_pixels=SAMPLE_SIZE):
+    """limit function returning percentiles of the image
+
+    Parameters
+    ----------
+    limit_args : tuple, optional
+        lower and upper percentiles. default to (1, 99)
+    max_pixels : int, optional
+        percentiles are computed on a strided subsample of about this
+        many pixels. None uses every pixel. default to SAMPLE_SIZE
+
+    Returns
+    -------
+    limit_func : callable
+        function taking an image and returning (vmin, vmax)
+    """
+    def _limit_func(image):
+        if max_pixels:
+            image = subsample(image, max_pixels)
+        return tuple(np.percentile(image, limit_args))
+    return _limit_func
+
+
+def sigma_clip_limit_factory(n_sigma=3, max_pixels=SAMPLE_SIZE):
+    """limit function returning median -/+ ``n_sigma`` robust deviations
+
+    The deviation is estimated from the median absolute deviation, so
+    hot or dead pixels don't widen the limits. Limits are clipped to the
+    range of the data.
+
+    Parameters
+    ----------
+    n_sigma : float, optional
+        width of the limits in standard deviations. default to 3
+    max_pixels : int, optional
+        statistics are computed on a strided subsample of about this
+        many pixels. None uses every pixel. default to SAMPLE_SIZE
+
+    Returns
+    -------
+    limit_func : callable
+        function taking an image and returning (vmin, vmax)
+    """
+    def _limit_func(image):
+        if max_pixels:
+            image = subsample(image, max_pixels)
+        median = np.median(image)
+        # 1.4826 * MAD estimates the standard deviation of normal data
+        sigma = 1.4826 * np.median(np.abs(image - median))
+        return (max(median - n_sigma * sigma, image.min()),
+                min(median + n_sigma * sigma, image.max()))
+    return _limit_func
+
 
 def auto_redraw(func):
     def inner(self, *args, **kwargs):
@@ -55,15 +215,31 @@ class CrossSection(object):
        Normalization function to use
 
     limit_func : callable, optional
-        function that takes in the image and returns clim values
+        function that takes in the image and returns clim values. It is
+        called once per image, the result is reused when the color map,
+        norm or interpolation change. default to the full range, see
+        also ``percentile_limit_factory`` and ``sigma_clip_limit_factory``
     auto_redraw : bool, optional
     interpolation : str, optional
         Interpolation method to use. List of valid options can be found in
         CrossSection2DView.interpolation
+    downsample : bool, optional
+        option to show large images through a pyramid of downsampled
+        levels, built in a background thread, picking the coarsest level
+        with at least one image pixel per screen pixel at the current
+        zoom. default to True
+    cut_width : int, optional
+        number of rows and columns averaged in the cross sections, centered
+        on the cursor. default to 1
+    max_fps : float, optional
+        maximum rate of cross section updates from mouse moves. Moves in
+        between are coalesced, the latest position is drawn by a timer.
+        None to update on every move. default to 30
     """
 
     def __init__(self, fig, cmap=None, norm=None,
-                 limit_func=None, auto_redraw=True, interpolation=None):
+                 limit_func=None, auto_redraw=True, interpolation=None,
+                 downsample=True, cut_width=1, max_fps=30):
 
         self._cursor_position_cbs = []
         self._interpolation = interpolation
@@ -71,7 +247,7 @@ class CrossSection(object):
         self._auto_redraw = auto_redraw
         # clean defaults
         if limit_func is None:
-            limit_func = lambda image: (image.min(), image.max())
+            limit_func = fullrange_limit_factory()
         if cmap is None:
             cmap = 'gray'
         # stash the color map
@@ -82,6 +258,26 @@ class CrossSection(object):
         self._norm = norm
         # save a copy of the limit function, we will need it later
         self._limit_func = limit_func
+        # color limits of the current image, None if not computed yet
+        self._vlim = None
+        # pyramid of the current image, None if not built yet
+        self.downsample = downsample
+        self._pyramid = None
+        self._pyramid_future = None
+        self._pyramid_timer = None
+        self._executor = None
+        self._level = 0
+        self._extent = None
+        # cumulative sums of the current image along rows and columns, for
+        # averaged cuts. None if not computed yet
+        self._cut_width = cut_width
+        self._cumsum = None
+        # coalescing of mouse moves, see _move_cb
+        self.max_fps = max_fps
+        self._pending_move = None
+        self._last_move = 0
+        self._move_timer = None
+        self._move_scheduled = False
 
         # this is used by the widget logic
         self._active = True
@@ -117,10 +313,13 @@ class CrossSection(object):
         self._im_ax.xaxis.set_major_locator(NullLocator())
         self._im_ax.yaxis.set_major_locator(NullLocator())
         self._imdata = None
+        self._im_ax.callbacks.connect('xlim_changed', self._on_view_changed)
+        self._im_ax.callbacks.connect('ylim_changed', self._on_view_changed)
         self._im = self._im_ax.imshow([[]], cmap=self._cmap, norm=self._norm,
                                       interpolation=self._interpolation,
-                                      aspect='equal', vmin=0,
-                                      vmax=1)
+                                      aspect='equal')
+        # newer matplotlib refuses vmin and vmax along with a norm
+        self._im.set_clim(0, 1)
 
         # make it dividable
         divider = make_axes_locatable(self._im_ax)
@@ -157,9 +356,10 @@ class CrossSection(object):
                                       animated=True,
                                       visible=False)
 
-        # backgrounds for blitting
+        # backgrounds for blitting, valid once a draw has completed
         self._ax_v_bk = None
         self._ax_h_bk = None
+        self._drawn = False
 
         # stash last-drawn row/col to skip if possible
         self._row = None
@@ -169,6 +369,7 @@ class CrossSection(object):
         self._move_cid = None
         self._click_cid = None
         self._clear_cid = None
+        self._resize_cid = None
 
     def add_cursor_position_cb(self, callback):
         """ Add a callback for the cursor position in the main axes
@@ -183,6 +384,34 @@ class CrossSection(object):
 
     # set up the call back for the updating the side axes
     def _move_cb(self, event):
+        if event is None or not self.max_fps:
+            self._update_cuts(event)
+            return
+        # short circuit on other axes
+        if event.inaxes is not self._im_ax:
+            return
+        self._pending_move = event
+        wait = self._last_move + 1 / self.max_fps - time.monotonic()
+        if wait <= 0:
+            self._flush_move()
+        elif not self._move_scheduled:
+            if self._move_timer is None:
+                self._move_timer = self._fig.canvas.new_timer()
+                self._move_timer.single_shot = True
+                self._move_timer.add_callback(self._flush_move)
+            self._move_scheduled = True
+            self._move_timer.start(int(wait * 1000) + 1)
+
+    def _flush_move(self):
+        """update the cross sections for the latest mouse move"""
+        event, self._pending_move = self._pending_move, None
+        self._move_scheduled = False
+        if event is None:
+            return
+        self._last_move = time.monotonic()
+        self._update_cuts(event)
+
+    def _update_cuts(self, event):
         if not self._active:
             return
         if event is None:
@@ -208,7 +437,7 @@ class CrossSection(object):
                     for cb in self._cursor_position_cbs:
                         cb(col, row)
                     for data, ax, bkg, art, set_fun in zip(
-                            (self._imdata[row, :], self._imdata[:, col]),
+                            self._cuts(row, col),
                             (self._ax_h, self._ax_v),
                             (self._ax_h_bk, self._ax_v_bk),
                             (self._ln_h, self._ln_v),
@@ -218,13 +447,57 @@ class CrossSection(object):
                         ax.draw_artist(art)
                         self._fig.canvas.blit(ax.bbox)
 
+    def _cuts(self, row, col):
+        """horizontal and vertical cuts through (row, col)
+
+        Cuts wider than a pixel are averages over a band of rows or
+        columns, centered on (row, col) and clipped at the image edges.
+        They are taken as differences of cumulative sums so their cost
+        does not depend on the width.
+        """
+        width = self._cut_width
+        if width <= 1:
+            return self._imdata[row, :], self._imdata[:, col]
+        if self._cumsum is None:
+            cumsum = []
+            for axis in (0, 1):
+                shape = list(self._imdata.shape)
+                shape[axis] += 1
+                total = np.zeros(shape)
+                np.cumsum(self._imdata, axis=axis,
+                          out=total[1:] if axis == 0 else total[:, 1:])
+                cumsum.append(total)
+            self._cumsum = cumsum
+        rows_sum, cols_sum = self._cumsum
+        numrows, numcols = self._imdata.shape
+        # the band is centered on the cursor and clipped at the edges
+        start = row - (width - 1) // 2
+        start, stop = max(start, 0), min(start + width, numrows)
+        h_cut = (rows_sum[stop] - rows_sum[start]) / (stop - start)
+        start = col - (width - 1) // 2
+        start, stop = max(start, 0), min(start + width, numcols)
+        v_cut = (cols_sum[:, stop] - cols_sum[:, start]) / (stop - start)
+        return h_cut, v_cut
+
+    @property
+    def cut_width(self):
+        return self._cut_width
+
+    def update_cut_width(self, width):
+        """
+        Set the number of rows and columns averaged in the cross sections
+        """
+        self._cut_width = max(int(width), 1)
+        if self._imdata is not None:
+            self._move_cb(None)
+
     def _click_cb(self, event):
         if event.inaxes is not self._im_ax:
             return
         self.active = not self.active
         if self.active:
             self._cur.onmove(event)
-            self._move_cb(event)
+            self._update_cuts(event)
 
     @auto_redraw
     def _connect_callbacks(self):
@@ -241,8 +514,10 @@ class CrossSection(object):
 
         self._clear_cid = self._fig.canvas.mpl_connect('draw_event',
                                                        self._clear)
+        self._resize_cid = self._fig.canvas.mpl_connect(
+            'resize_event', self._on_view_changed)
         self._fig.tight_layout()
-        self._fig.canvas.draw_idle()
+        self._draw()
 
     def _disconnect_callbacks(self):
         """
@@ -254,9 +529,10 @@ class CrossSection(object):
             self._move_cid = None
             self._clear_cid = None
             self._click_cid = None
+            self._resize_cid = None
             return
 
-        for atr in ('_move_cid', '_clear_cid', '_click_cid'):
+        for atr in ('_move_cid', '_clear_cid', '_click_cid', '_resize_cid'):
             cid = getattr(self, atr, None)
             if cid is not None:
                 self._fig.canvas.mpl_disconnect(cid)
@@ -288,10 +564,13 @@ class CrossSection(object):
         # update the image, `update_artists` takes care of
         # updating the actual artist
         self._imdata = init_image
+        self._vlim = None
+        self._cumsum = None
+        self._request_pyramid()
 
         # update the extent of the image artist
-        self._im.set_extent([-0.5, im_shape[1] + .5,
-                             im_shape[0] + .5, -0.5])
+        self._extent = [-0.5, im_shape[1] + .5, im_shape[0] + .5, -0.5]
+        self._im.set_extent(self._extent)
 
         # update the limits of the image axes to match the exent
         self._im_ax.set_xlim([-.05, im_shape[1] + .5])
@@ -319,7 +598,8 @@ class CrossSection(object):
         # net deal with the parasite axes and artist
         self._ln_v.set_data(np.zeros(im_shape[0]),
                             np.arange(im_shape[0]))
-        self._ax_v.set_ylim([0, im_shape[0]])
+        # y is shared with the image axes, keep row 0 on top
+        self._ax_v.set_ylim([im_shape[0], 0])
 
         self._ln_h.set_data(np.arange(im_shape[1]),
                             np.zeros(im_shape[1]))
@@ -332,6 +612,7 @@ class CrossSection(object):
         self._dirty = True
 
     def _clear(self, event):
+        self._drawn = True
         self._ax_v_bk = self._fig.canvas.copy_from_bbox(self._ax_v.bbox)
         self._ax_h_bk = self._fig.canvas.copy_from_bbox(self._ax_h.bbox)
         self._ln_h.set_visible(False)
@@ -374,20 +655,174 @@ class CrossSection(object):
         self._cmap = cmap
         self._dirty = True
 
-    @auto_redraw
-    def update_image(self, image):
+    def update_image(self, image, force_redraw=None, cached_stats=False):
         """
         Set the image data
 
         The input data does not necessarily have to be the same shape as the
-        original image
+        original image. When the shape, color limits, color map and norm are
+        unchanged, only the image and the cuts are redrawn, by blitting.
+
+        Parameters
+        ----------
+        image : ndarray
+            the image
+        force_redraw : bool, optional
+            whether to redraw. default to the auto_redraw option
+        cached_stats : bool, optional
+            whether statistics of the image in ``frame_stats`` are up to
+            date, as for frames read from files. Otherwise they are
+            dropped, since the image may have changed in place. default
+            to False
+
+        Returns
+        -------
+        blitted : bool
+            whether the fast path was taken, other figure artists are not
+            redrawn then
         """
+        if self._fig.canvas is None:
+            return False
+        if force_redraw is None:
+            force_redraw = self._auto_redraw
+        if not cached_stats:
+            frame_stats.invalidate(image)
         image = np.asarray(image)
+        blit = force_redraw and self._can_blit()
         if self._imdata is None or self._imdata.shape != image.shape:
+            blit = False
             self._init_artists(image)
-        self._imdata = image
-        self._move_cb(None)
+        else:
+            self._imdata = image
+            self._cumsum = None
+            self._request_pyramid()
+        self._vlim = None
         self._dirty = True
+        if blit:
+            self._vlim = self._limit_func(image)
+            blit = tuple(self._vlim) == tuple(self._im.get_clim())
+        if blit:
+            self._blit_image()
+            return True
+        self._move_cb(None)
+        if force_redraw:
+            self._update_artists()
+            self._draw()
+        return False
+
+    def _can_blit(self):
+        """whether the last full draw is on screen and nothing is pending"""
+        return (getattr(self._fig.canvas, 'supports_blit', False) and
+                self._drawn and not (self._dirty or self._cb_dirty))
+
+    def _blit_image(self):
+        """redraw the image axes and the cuts only"""
+        canvas = self._fig.canvas
+        self._set_display_data()
+        self._dirty = False
+        ax = self._im_ax
+        # paint the backgrounds first, the spines overlap the axes edge and
+        # masked pixels are transparent
+        bbox = ax.bbox.padded(2)
+        patch = self._fig.patch
+        patch.set_clip_box(bbox)
+        self._fig.draw_artist(patch)
+        patch.set_clip_box(None)
+        ax.draw_artist(ax.patch)
+        ax.draw_artist(self._im)
+        for spine in ax.spines.values():
+            ax.draw_artist(spine)
+        # the cursor background still holds the previous frame
+        if self._cur is not None:
+            self._cur.background = canvas.copy_from_bbox(self._fig.bbox)
+            for line in (self._cur.lineh, self._cur.linev):
+                if line.get_visible():
+                    ax.draw_artist(line)
+        canvas.blit(bbox)
+        self._move_cb(None)
+
+    def _request_pyramid(self):
+        """build the pyramid of the current image in the background"""
+        image = self._imdata
+        self._pyramid = None
+        if self._pyramid_future is not None:
+            self._pyramid_future.cancel()
+            self._pyramid_future = None
+        if not self.downsample or pyramid_depth(image.shape) == 1:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1)
+        self._pyramid_future = self._executor.submit(pyramid, image)
+        if self._pyramid_timer is None:
+            self._pyramid_timer = self._fig.canvas.new_timer(interval=50)
+            self._pyramid_timer.add_callback(self._check_pyramid)
+        self._pyramid_timer.start()
+
+    def _check_pyramid(self, redraw=True):
+        """pick up a finished pyramid
+
+        If a strided preview is shown, it is replaced by the pyramid level,
+        by blitting when possible.
+        """
+        future = self._pyramid_future
+        if future is None or not future.done():
+            return
+        self._pyramid_future = None
+        if self._pyramid_timer is not None:
+            self._pyramid_timer.stop()
+        if future.cancelled():
+            return
+        self._pyramid = future.result()
+        if not (redraw and self._level):
+            return
+        if self._can_blit():
+            self._blit_image()
+        else:
+            self._set_display_data()
+            self._fig.canvas.draw_idle()
+
+    def _pick_level(self):
+        """index of the pyramid level matching the current zoom"""
+        if not self.downsample:
+            return 0
+        ax = self._im_ax
+        x0, x1 = ax.get_xlim()
+        y0, y1 = ax.get_ylim()
+        # image pixels per screen pixel, along the finer direction
+        ratio = min(abs(x1 - x0) / max(ax.bbox.width, 1),
+                    abs(y1 - y0) / max(ax.bbox.height, 1))
+        level = int(np.log2(ratio)) if ratio >= 1 else 0
+        return min(level, pyramid_depth(self._imdata.shape) - 1)
+
+    def _set_display_data(self):
+        """hand the pyramid level matching the zoom to the image artist
+
+        Until the pyramid of the image is built, the level is previewed by
+        striding through the image.
+        """
+        self._check_pyramid(redraw=False)
+        self._level = self._pick_level()
+        if not self._level:
+            self._im.set_data(self._imdata)
+            self._im.set_extent(self._extent)
+            return
+        rows, cols = self._imdata.shape
+        scale = 2 ** self._level
+        if self._pyramid is not None:
+            data = self._pyramid[self._level]
+        else:
+            data = self._imdata[:rows // scale * scale:scale,
+                                :cols // scale * scale:scale]
+        # odd rows and columns were dropped while downsampling
+        left, right, bottom, top = self._extent
+        self._im.set_data(data)
+        self._im.set_extent([
+            left, left + (right - left) * data.shape[1] * scale / cols,
+            top + (bottom - top) * data.shape[0] * scale / rows, top])
+
+    def _on_view_changed(self, *args):
+        if self._imdata is not None and self._pick_level() != self._level:
+            self._set_display_data()
 
     @auto_redraw
     def update_norm(self, norm):
@@ -405,6 +840,7 @@ class CrossSection(object):
         """
         # set the new function to use for computing the color limits
         self._limit_func = limit_func
+        self._vlim = None
         self._dirty = True
 
     def _update_artists(self):
@@ -418,8 +854,10 @@ class CrossSection(object):
         # this is a tuple which is the max/min used in the color mapping.
         # these values are also used to set the limits on the value
         # axes of the parasite axes
-        # value_limits
-        vlim = self._limit_func(self._imdata)
+        # value_limits, computed once per image
+        if self._vlim is None:
+            self._vlim = self._limit_func(self._imdata)
+        vlim = self._vlim
         # set the color bar limits
         self._im.set_clim(vlim)
         self._norm.vmin, self._norm.vmax = vlim
@@ -431,13 +869,15 @@ class CrossSection(object):
         self._im.set_norm(self._norm)
         if self._imdata is None:
             return
-        self._im.set_data(self._imdata)
+        self._set_display_data()
         # TODO if cb_dirty, remake the colorbar, I think this is
         # why changing the norm does not play well
         self._dirty = False
         self._cb_dirty = False
 
     def _draw(self):
+        # blitting waits for the backgrounds of this draw
+        self._drawn = False
         self._fig.canvas.draw_idle()
 
     @auto_redraw
@@ -458,18 +898,55 @@ class StackViewer(object):
     Parameters
     ----------
     viewer : object
-        expected to have update_image method and fig attribute
+        expected to have update_image method, taking a cached_stats
+        keyword as ``CrossSection.update_image``, and fig attribute
     key_list: list, optional
         a list of key names carried by this class. default to None.
     img_data_list : list, optional
-        a list of 2D numpy arrays, default to None
+        a list of images, default to None. Each image is either a 2D
+        numpy array or a lazy source, which is a file name or a callable
+        returning the array. Lazy sources are read when the frame is
+        shown and kept in a LRU cache.
+    loader : callable, optional
+        function to read file names in ``img_data_list``. default to
+        ``xpdview.utils.read_image``
+    cache_size : int, optional
+        memory limit of cached frames in bytes, memory-mapped frames are
+        not counted. default to CACHE_SIZE
+    mapped_frames : int, optional
+        maximum number of cached memory-mapped frames, which hold a file
+        descriptor each. default to MAPPED_FRAMES
+    prefetch : int, optional
+        number of lazy frames read ahead in the scrubbing direction by a
+        background thread, half as many are read behind. The cache should
+        hold at least 1.5 times as many frames. default to 4
     """
 
-    def __init__(self, viewer, key_list=None, img_data_list=None):
+    def __init__(self, viewer, key_list=None, img_data_list=None, *,
+                 loader=None, cache_size=CACHE_SIZE,
+                 mapped_frames=MAPPED_FRAMES, prefetch=4):
         self.viewer = viewer
         self.key_list = key_list
         self.img_data_list = img_data_list
+        if loader is None:
+            loader = read_image
+        self.loader = loader
+        self.cache_size = cache_size
+        self.mapped_frames = mapped_frames
+        self._cache = OrderedDict()
+        self._cache_nbytes = 0
+        self._cache_mapped = 0
+        # prefetching state, guarded by the lock as the worker fills the
+        # cache. generation is bumped when indices become invalid
+        self.prefetch = prefetch
+        self._lock = threading.Lock()
+        self._executor = None
+        self._prefetching = {}
+        self._generation = 0
+        self._last_ind = None
+        self._step = 1
         self.fig = self.viewer._fig
+        self._title = None
         # create slider
         if not key_list:
             self.data_length = None  # init
@@ -485,12 +962,68 @@ class StackViewer(object):
         # grab int val from slider
         _val = self.slider.val
         # update 2d viewer
-        self.viewer.update_image(self.img_data_list[_val])
+        # frames given as arrays may be changed in place, read ones are not
+        blitted = self.viewer.update_image(
+            self.get_frame(_val), cached_stats=not isinstance(
+                self.img_data_list[_val], np.ndarray))
+        self._schedule_prefetch(_val)
         # give title if key_list is available
         if self.key_list:
-            self.fig.suptitle(self.key_list[_val], fontsize=10)
+            self.set_title(self.key_list[_val], blit=blitted)
+        if blitted:
+            bbox = Bbox.union([self.slider_ax.bbox,
+                               self.slider.label.get_window_extent(),
+                               self.slider.valtext.get_window_extent()])
+            self._blit(bbox, [self.slider_ax])
+        else:
+            self.fig.canvas.draw_idle()
+
+    def set_title(self, title, blit=False):
+        """set the figure title
 
-    def update(self, key_list, img_data_list, refresh=False):
+        Parameters
+        ----------
+        title : str
+            the title
+        blit : bool, optional
+            if True, the title is redrawn by blitting, for frames which
+            were blitted by the viewer. default to False
+        """
+        old = None
+        if blit and self._title is not None:
+            old = self._title.get_window_extent()
+        self._title = self.fig.suptitle(title, fontsize=10)
+        if not blit:
+            return
+        bbox = self._title.get_window_extent()
+        if old is not None:
+            bbox = Bbox.union([old, bbox])
+        self._blit(bbox, [self._title])
+
+    def _blit(self, bbox, artists):
+        """redraw artists over the figure background within bbox"""
+        canvas = self.fig.canvas
+        bbox = bbox.padded(2)
+        # axes reaching into the region are painted over and redrawn whole,
+        # the buffer outside of the region is put back afterwards
+        saved = canvas.copy_from_bbox(self.fig.bbox)
+        patch = self.fig.patch
+        patch.set_clip_box(bbox)
+        self.fig.draw_artist(patch)
+        patch.set_clip_box(None)
+        renderer = canvas.get_renderer()
+        for ax in self.fig.axes:
+            if (ax not in artists and
+                    ax.get_tightbbox(renderer).overlaps(bbox)):
+                self.fig.draw_artist(ax)
+        for art in artists:
+            self.fig.draw_artist(art)
+        region = canvas.copy_from_bbox(bbox)
+        canvas.restore_region(saved)
+        canvas.restore_region(region)
+        canvas.blit(bbox)
+
+    def update(self, key_list, img_data_list, refresh=False, follow=True):
         """method to update data carried by stack viewr
 
         Parameters
@@ -502,20 +1035,145 @@ class StackViewer(object):
             update
         refresh: bool, optional
             option of refreshing or not
+        follow : bool, optional
+            option to move to the frame after the current one. If False,
+            the current frame is kept. default to True
         """
-        # TODO: figure out origin of this weird flipping logic
-        img_data_list = list(map(lambda x: np.flipud(x), img_data_list))
-        update_ind = self.slider.val + 1
-        if refresh:
+        update_ind = self.slider.val + int(follow)
+        if refresh or self.img_data_list is None:
             self.key_list = []
             self.img_data_list = []
+            self.clear_cache()
             update_ind = 0
         self.key_list.extend(key_list)
         self.img_data_list.extend(img_data_list)
         self.data_length = len(self.img_data_list)
         self.configure_slider()
+        if not self.data_length:
+            self.no_image_plot()
+            return
         # udpate plots
-        self.update_frame_slider(update_ind)
+        self.slider.set_val(min(update_ind, self.data_length - 1))
+
+    def get_frame(self, ind):
+        """return image ``ind``, reading lazy sources through the cache
+
+        Parameters
+        ----------
+        ind : int
+            index of the image
+
+        Returns
+        -------
+        img : ndarray
+        """
+        source = self.img_data_list[ind]
+        if isinstance(source, np.ndarray):
+            return source
+        with self._lock:
+            if ind in self._cache:
+                self._cache.move_to_end(ind)
+                return self._cache[ind]
+            future = self._prefetching.get(ind)
+        if future is not None and not future.cancel():
+            # being read in the background, wait for it
+            img = future.result()
+        else:
+            if future is not None:
+                with self._lock:
+                    self._prefetching.pop(ind, None)
+            img = self._read(source)
+        self._cache_put(ind, img, self._generation)
+        return img
+
+    def _read(self, source):
+        """decode a lazy source"""
+        if callable(source):
+            return source()
+        return self.loader(source)
+
+    def _cache_put(self, ind, img, generation):
+        """add a frame to the cache, evicting least recently used ones
+
+        Memory-mapped frames are limited in number rather than in bytes,
+        their pages are left to the operating system.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            if ind in self._cache:
+                self._cache_count(self._cache.pop(ind), -1)
+            self._cache[ind] = img
+            self._cache_count(img, 1)
+            while True:
+                mapped = self._cache_mapped > self.mapped_frames
+                if not mapped and self._cache_nbytes <= self.cache_size:
+                    break
+                # drop the least recently used frame of the kind over its
+                # limit, but keep this one
+                old_ind = next(i for i, old in self._cache.items()
+                               if isinstance(old, np.memmap) == mapped)
+                if old_ind == ind:
+                    break
+                self._cache_count(self._cache.pop(old_ind), -1)
+
+    def _cache_count(self, img, sign):
+        if isinstance(img, np.memmap):
+            self._cache_mapped += sign
+        else:
+            self._cache_nbytes += sign * img.nbytes
+
+    def _prefetch_one(self, ind, source, generation):
+        try:
+            img = self._read(source)
+            # the limits are cheaper to get here than on the gui thread
+            frame_stats.compute(img, LIMIT_STATS)
+            self._cache_put(ind, img, generation)
+            return img
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._prefetching.pop(ind, None)
+
+    def _schedule_prefetch(self, ind):
+        """read lazy frames around ``ind`` in the background
+
+        Frames ahead in the direction of the last move come first, reads
+        which are no longer wanted and have not started are cancelled.
+        """
+        if not self.prefetch or not self.img_data_list:
+            return
+        if self._last_ind is not None and ind != self._last_ind:
+            self._step = 1 if ind > self._last_ind else -1
+        self._last_ind = ind
+        wanted = ([ind + self._step * i
+                   for i in range(1, self.prefetch + 1)] +
+                  [ind - self._step * i
+                   for i in range(1, self.prefetch // 2 + 1)])
+        wanted = [i for i in wanted if 0 <= i < len(self.img_data_list)
+                  and not isinstance(self.img_data_list[i], np.ndarray)]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1)
+        with self._lock:
+            for i, future in list(self._prefetching.items()):
+                if i not in wanted and future.cancel():
+                    del self._prefetching[i]
+            for i in wanted:
+                if i not in self._cache and i not in self._prefetching:
+                    self._prefetching[i] = self._executor.submit(
+                        self._prefetch_one, i, self.img_data_list[i],
+                        self._generation)
+
+    def clear_cache(self):
+        """drop all cached frames and pending background reads"""
+        with self._lock:
+            self._generation += 1
+            for future in self._prefetching.values():
+                future.cancel()
+            self._prefetching.clear()
+            self._cache.clear()
+            self._cache_nbytes = 0
+            self._cache_mapped = 0
 
     def no_image_plot(self):
         """method to call when no valid image files are found"""
@@ -524,13 +1182,24 @@ class StackViewer(object):
         self.viewer.update_image(default_array)
 
     def configure_slider(self):
-        """method to update upper and lower limit of slider"""
+        """method to update upper and lower limit of slider
+
+        The slider is created once and its range is changed in place
+        afterwards, so callbacks linked to it stay connected.
+        """
         if not self.data_length:
             max_val = 0
         else:
             max_val = self.data_length - 1
-        self.slider_ax.cla()
-        self.slider = Slider(self.slider_ax, 'image ind.', 0, max_val, 0,
-                             valfmt='%d/{}'.format(max_val))
-        # link callback
-        self.slider.on_changed(self.update_frame_slider)
+        if not hasattr(self, 'slider'):
+            self.slider = Slider(self.slider_ax, 'image ind.', 0, max_val, 0,
+                                 valfmt='%d/{}'.format(max_val))
+            # drawn by update_frame_slider, possibly by blitting
+            self.slider.drawon = False
+            # link callback
+            self.slider.on_changed(self.update_frame_slider)
+            return
+        self.slider.valmax = max_val
+        self.slider.valfmt = '%d/{}'.format(max_val)
+        self.slider_ax.set_xlim(0, max(max_val, 1))
+        self.slider.valtext.set_text(self.slider.valfmt % self.slider.val)
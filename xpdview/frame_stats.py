@@ -0,0 +1,135 @@
+"""module to cache statistics of 2D frames"""
+import threading
+import weakref
+
+import numpy as np
+
+# statistics known by name, FrameStats.compute gets all of them by default
+STATS = {
+    'min': np.min,
+    'max': np.max,
+    'mean': np.mean,
+    'std': np.std,
+    'sum': np.sum,
+}
+# functions sharing the entries of the statistics computed by name
+NAMES = {func: name for name, func in STATS.items()}
+NAMES.update({np.amin: 'min', np.amax: 'max'})
+
+
+def crop(frame, roi=None):
+    """view of the region of interest (y_start, y_stop, x_start, x_stop)"""
+    if roi is None:
+        return frame
+    y_start, y_stop, x_start, x_stop = roi
+    return frame[y_start:y_stop, x_start:x_stop]
+
+
+class FrameStats:
+    """cache of per-frame statistics
+
+    Values are keyed by frame identity, region of interest and statistic,
+    so every consumer of the same array shares them. The entries of a
+    frame are dropped when the array is garbage collected; frames changed
+    in place have to be passed to ``invalidate``.
+
+    Statistics are given either by name (a key of ``STATS``) or as a
+    function taking an array and returning a value, the functions of
+    ``STATS`` share the entries of their names. Arrays viewing a whole
+    memory map, as returned by ``np.asarray``, share the entries of the
+    memory map.
+    """
+
+    def __init__(self):
+        # {id(frame): {(roi, stat): value}}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(frame, stat, roi):
+        """(owner array, entry key) of a statistic"""
+        base = getattr(frame, 'base', None)
+        if (isinstance(base, np.memmap) and
+                base.__array_interface__ == frame.__array_interface__):
+            frame = base
+        if roi is not None:
+            roi = tuple(roi)
+            if all(v is None for v in roi):
+                roi = None
+        return frame, (roi, NAMES.get(stat, stat))
+
+    def _entries(self, frame):
+        with self._lock:
+            entries = self._cache.get(id(frame))
+            if entries is None:
+                entries = self._cache[id(frame)] = {}
+                weakref.finalize(frame, self._cache.pop, id(frame), None)
+            return entries
+
+    def get(self, frame, stat, roi=None):
+        """return a statistic of a frame, computing it if needed
+
+        Parameters
+        ----------
+        frame : ndarray
+            2D frame
+        stat : str or callable
+            name of the statistic or function computing it
+        roi : tuple, optional
+            (y_start, y_stop, x_start, x_stop) of the region of interest,
+            None entries extend to the edge. default to the whole frame
+
+        Returns
+        -------
+        value : the statistic
+        """
+        owner, key = self._key(frame, stat, roi)
+        entries = self._entries(owner)
+        try:
+            return entries[key]
+        except KeyError:
+            pass
+        roi, stat = key
+        func = STATS[stat] if isinstance(stat, str) else stat
+        value = func(crop(frame, roi))
+        entries[key] = value
+        return value
+
+    def cached(self, frame, stat, roi=None):
+        """return whether a statistic is already cached"""
+        owner, key = self._key(frame, stat, roi)
+        return key in self._cache.get(id(owner), {})
+
+    def put(self, frame, stat, value, roi=None):
+        """store a statistic computed elsewhere"""
+        owner, key = self._key(frame, stat, roi)
+        self._entries(owner)[key] = value
+
+    def compute(self, frame, stats=STATS, roi=None):
+        """compute statistics of a frame ahead of their use
+
+        This is meant to be called once, when the frame is loaded.
+
+        Parameters
+        ----------
+        frame : ndarray
+            2D frame
+        stats : iterable, optional
+            names of the statistics. default to all of ``STATS``
+        roi : tuple, optional
+            region of interest. default to the whole frame
+        """
+        for stat in stats:
+            self.get(frame, stat, roi)
+
+    def invalidate(self, frame=None):
+        """drop the statistics of a frame, or of all frames"""
+        with self._lock:
+            if frame is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(id(self._key(frame, None, None)[0]), None)
+
+
+# statistics shared by the image viewer and the reduced representation
+frame_stats = FrameStats()
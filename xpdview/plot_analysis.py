@@ -17,11 +17,66 @@
 """
 
 import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from xpdview.frame_stats import frame_stats, crop
+
+# below this number of pixels the analysis is done in process
+PARALLEL_MIN_SIZE = 2 ** 24
+# below this number of pixels regions of interest are stacked in process
+STACK_MAX_SIZE = 1024
+# reductions applied at once to a stack of regions of interest
+VECTORIZED = {np.mean, np.std, np.var, np.sum, np.median,
+              np.min, np.max, np.amin, np.amax}
+
+_executor = None
+
+
+def analysis_executor():
+    """process pool shared by reduced representations, created on first use
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _apply(func, stack):
+    """apply func to every frame of a 3D stack"""
+    if func in VECTORIZED:
+        return list(func(stack, axis=(1, 2)))
+    return [func(frame) for frame in stack]
+
+
+def _apply_shared(func, name, shape, dtype, start, stop):
+    """apply func to frames start:stop of a stack in shared memory"""
+    shm = shared_memory.SharedMemory(name=name)
+    stack = np.ndarray(shape, dtype, buffer=shm.buf)
+    try:
+        return _apply(func, stack[start:stop])
+    finally:
+        # views have to be released before closing
+        del stack
+        shm.close()
+
+
+def _picklable(func):
+    try:
+        pickle.dumps(func)
+    except Exception:
+        return False
+    return True
 
 
 class ReducedRepPlot:
 
-    def __init__(self, data_dict, key_list, figure, canvas, func_dict, selection=None):
+    def __init__(self, data_dict, key_list, figure, canvas, func_dict,
+                 selection=None, executor=None):
         """constructor for reducedRepPlot object
 
         Parameters
@@ -42,6 +97,9 @@ class ReducedRepPlot:
         canvas : FigureCanvas
             The canvas where the reduced rep plotting is drawn
 
+        executor : concurrent.futures.Executor (optional)
+            The pool analysing large data, default to a process pool
+            shared by all reduced rep plots and created on first use
 
         """
 
@@ -57,6 +115,7 @@ class ReducedRepPlot:
         self.fig = figure
         self.canvas = canvas
         self.func_dict = func_dict
+        self._executor = executor
         # default func dict is simple analysis functions
 
     def analyze(self):
@@ -66,13 +125,7 @@ class ReducedRepPlot:
         None
 
         """
-        p = multiprocessing.Pool()
-        vals = []
-        for key in self.key_list:
-            vals.append(self.data_dict[key][self.y_start: self.y_stop, self.x_start: self.x_stop])
-        y = p.map(self.func_dict[self.selection], vals)
-        p.close()
-        p.join()
+        y = self._analyze([self.data_dict[key] for key in self.key_list])
 
         assert (len(y) == len(self.key_list))
         self.y_data = y
@@ -90,15 +143,68 @@ class ReducedRepPlot:
         a list of y data from the analysis
         """
 
-        p = multiprocessing.Pool()
-        vals = []
-        for data in data_list:
-            vals.append(data[self.y_start: self.y_stop, self.x_start: self.x_stop])
-        y = p.map(self.func_dict[self.selection], vals)
-        p.close()
-        p.join()
+        return self._analyze(data_list)
+
+    @property
+    def roi(self):
+        """(y_start, y_stop, x_start, x_stop) of the analyzed region"""
+        return self.y_start, self.y_stop, self.x_start, self.x_stop
 
-        return y
+    @property
+    def executor(self):
+        """pool analysing large data"""
+        if self._executor is None:
+            self._executor = analysis_executor()
+        return self._executor
+
+    def _analyze(self, frames):
+        """apply the selected function to the region of interest of frames
+
+        Values are looked up in the shared frame statistics first, only the
+        missing ones are computed and then stored.
+        """
+        func = self.func_dict[self.selection]
+        roi = self.roi
+        missing = [frame for frame in frames
+                   if not frame_stats.cached(frame, func, roi)]
+        if missing:
+            y = self._compute(func, [crop(frame, roi) for frame in missing])
+            for frame, val in zip(missing, y):
+                frame_stats.put(frame, func, val, roi)
+        return [frame_stats.get(frame, func, roi) for frame in frames]
+
+    def _compute(self, func, vals):
+        """apply func to regions of interest of the same or varying shapes
+
+        Small work is done in process, large work is split among the
+        processes of the executor, with the regions copied once into
+        shared memory instead of being pickled.
+        """
+        size = sum(val.size for val in vals)
+        if len({val.shape for val in vals}) > 1:
+            return [func(val) for val in vals]
+        if size < PARALLEL_MIN_SIZE or not _picklable(func):
+            if vals[0].size < STACK_MAX_SIZE:
+                return _apply(func, np.stack(vals))
+            return [func(val) for val in vals]
+        dtype = np.result_type(*{val.dtype for val in vals})
+        shape = (len(vals),) + vals[0].shape
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=size * dtype.itemsize)
+        try:
+            stack = np.ndarray(shape, dtype, buffer=shm.buf)
+            for i, val in enumerate(vals):
+                stack[i] = val
+            del stack
+            n_chunks = min(len(vals), multiprocessing.cpu_count())
+            bounds = np.linspace(0, len(vals), n_chunks + 1).astype(int)
+            futures = [self.executor.submit(_apply_shared, func, shm.name,
+                                            shape, dtype.str, start, stop)
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            return [val for future in futures for val in future.result()]
+        finally:
+            shm.close()
+            shm.unlink()
 
     def show(self, new_data=None):
         """handles plotting for the reduced rep plot panel
@@ -0,0 +1,31 @@
+import numpy as np
+from xpdview import callbacks
+from xpdview.callbacks import LiveWaterfall
+
+
+def test_batched_updates(monkeypatch):
+    now = [5000.]
+    monkeypatch.setattr(callbacks.time, 'monotonic', lambda: now[0])
+    cb = LiveWaterfall(max_fps=1e-3, batch_size=3)
+    cb('start', {'uid': 'start', 'time': 0.,
+                 'hints': {'dimensions': [(['x'], 'primary')]}})
+    cb('descriptor', {'uid': 'desc', 'run_start': 'start', 'time': 0.,
+                      'name': 'primary',
+                      'data_keys': {
+                          'x': {'shape': [5], 'dtype': 'array',
+                                'source': ''},
+                          'y': {'shape': [5], 'dtype': 'array',
+                                'source': ''}}})
+    calls = []
+    cb.wfs[('x', 'y')].update = (
+        lambda key_list, int_data_list: calls.append(list(key_list)))
+    for i in range(1, 6):
+        cb('event', {'uid': str(i), 'descriptor': 'desc', 'seq_num': i,
+                     'time': 0., 'timestamps': {},
+                     'data': {'x': np.arange(5), 'y': np.ones(5) * i}})
+    # the first event is drawn at once, then the rate limit holds events
+    # back until a batch is full
+    assert calls == [[1], [2, 3, 4]]
+    cb('stop', {'uid': 'stop', 'run_start': 'start', 'time': 0.,
+                'exit_status': 'success'})
+    assert calls == [[1], [2, 3, 4], [5]]
@@ -0,0 +1,83 @@
+import types
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from xpdview import cross_2d
+from xpdview.cross_2d import (CrossSection, subsample, pyramid, pyramid_depth,
+                              fullrange_limit_factory,
+                              percentile_limit_factory,
+                              sigma_clip_limit_factory)
+
+
+def test_limit_funcs():
+    rs = np.random.RandomState(0)
+    image = rs.normal(10, 1, (2000, 2000))
+    image[5, 5] = 1e6
+    assert subsample(image, 2 ** 18).size <= 2 ** 18
+    assert subsample(image, 2 ** 18).base is image
+    assert fullrange_limit_factory()(image) == (image.min(), 1e6)
+    lo, hi = percentile_limit_factory((1, 99))(image)
+    assert abs(lo - 7.67) < 0.1 and abs(hi - 12.33) < 0.1
+    lo, hi = sigma_clip_limit_factory(3)(image)
+    assert abs(lo - 7) < 0.1 and abs(hi - 13) < 0.1
+
+
+def test_pyramid():
+    image = np.arange(1025 * 1100, dtype=np.uint16).reshape(1025, 1100)
+    levels = pyramid(image, min_size=256)
+    assert [level.shape for level in levels] == [(1025, 1100), (512, 550),
+                                                 (256, 275)]
+    assert levels[0] is image
+    assert pyramid_depth(image.shape, min_size=256) == 3
+    assert pyramid_depth((511, 4000), min_size=256) == 1
+    assert levels[1][0, 0] == image[:2, :2].mean()
+    assert levels[2][-1, -1] == image[1020:1024, 1096:1100].mean()
+
+
+def test_averaged_cuts():
+    image = np.random.RandomState(0).rand(7, 9)
+    section = types.SimpleNamespace(_imdata=image, _cumsum=None)
+    for width in (1, 2, 3, 4, 5):
+        section._cut_width = width
+        for row, col in ((0, 0), (3, 4), (6, 8), (1, 7), (5, 1)):
+            h_cut, v_cut = CrossSection._cuts(section, row, col)
+            r0 = row - (width - 1) // 2
+            c0 = col - (width - 1) // 2
+            assert np.allclose(
+                h_cut, image[max(r0, 0):r0 + width].mean(0))
+            assert np.allclose(
+                v_cut, image[:, max(c0, 0):c0 + width].mean(1))
+    # bands of even width have one more row after the cursor than before
+    section._cut_width = 4
+    assert np.allclose(CrossSection._cuts(section, 3, 4)[0],
+                       image[2:6].mean(0))
+
+
+def test_coalesced_moves(monkeypatch):
+    now = [100.]
+    monkeypatch.setattr(cross_2d.time, 'monotonic', lambda: now[0])
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    section = CrossSection(fig, max_fps=10)
+    section.update_image(np.zeros((20, 20)))
+    fig.canvas.draw()
+    calls = []
+    section.add_cursor_position_cb(lambda col, row: calls.append((col, row)))
+
+    def move(x, y):
+        section._move_cb(types.SimpleNamespace(
+            inaxes=section._im_ax, xdata=x, ydata=y))
+
+    move(1, 1)
+    assert calls == [(1, 1)]
+    # within one frame interval, only the latest move is kept
+    now[0] += 0.01
+    for i in (2, 3, 4):
+        move(i, i)
+    assert calls == [(1, 1)] and section._move_scheduled
+    section._flush_move()
+    assert calls == [(1, 1), (4, 4)]
+    # once the interval passed, moves are handled at once
+    now[0] += 0.2
+    move(5, 6)
+    assert calls == [(1, 1), (4, 4), (5, 6)]
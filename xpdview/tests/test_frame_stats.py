@@ -0,0 +1,70 @@
+import gc
+import numpy as np
+from xpdview.frame_stats import FrameStats, frame_stats
+from xpdview.plot_analysis import ReducedRepPlot
+
+
+def test_frame_stats():
+    stats = FrameStats()
+    calls = []
+
+    def count(a):
+        calls.append(a.shape)
+        return a.sum()
+
+    frame = np.arange(12.).reshape(3, 4)
+    assert stats.get(frame, 'max') == 11
+    assert stats.get(frame, count, (0, 2, 1, 3)) == 1 + 2 + 5 + 6
+    assert stats.get(frame, count, (0, 2, 1, 3)) == 14
+    assert calls == [(2, 2)]
+    stats.compute(frame)
+    assert stats.cached(frame, 'std')
+    frame += 1
+    stats.invalidate(frame)
+    assert not stats.cached(frame, 'max')
+    assert stats.get(frame, 'max') == 12
+    # entries are dropped with the frame
+    del frame
+    gc.collect()
+    assert not stats._cache
+
+
+def test_reduced_rep_shares_stats():
+    frames = {'a': np.ones((4, 4)), 'b': np.zeros((4, 4))}
+    rpp = ReducedRepPlot(frames, ['a', 'b'], None, None,
+                         {'sum': np.sum}, 'sum')
+    rpp.x_start, rpp.x_stop = 1, 3
+    rpp.analyze()
+    assert rpp.y_data == [8, 0]
+    frames['a'][:] = 2
+    # frames changed in place have to be invalidated
+    frame_stats.invalidate(frames['a'])
+    rpp.analyze()
+    assert rpp.y_data == [16, 0]
+
+
+def test_memmap_views_share_stats(tmpdir):
+    fn = str(tmpdir.join('frame.npy'))
+    np.save(fn, np.arange(12.).reshape(3, 4))
+    frame = np.load(fn, mmap_mode='r')
+    stats = FrameStats()
+    stats.compute(frame, ('min', 'max'))
+    assert stats.cached(np.asarray(frame), 'max')
+    assert not stats.cached(frame[1:], 'max')
+
+
+def test_reduced_rep_hits_computed_stats(monkeypatch):
+    frame = np.arange(16.).reshape(4, 4)
+    frame_stats.compute(frame, ('min', 'max'))
+
+    def compute(*args):
+        raise AssertionError('statistics computed again')
+
+    monkeypatch.setattr(ReducedRepPlot, '_compute', compute)
+    rpp = ReducedRepPlot({'a': frame}, ['a'], None, None,
+                         {'amin': np.amin, 'amax': np.amax}, 'amin')
+    rpp.analyze()
+    assert rpp.y_data == [0]
+    rpp.selection = 'amax'
+    rpp.analyze()
+    assert rpp.y_data == [15]
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from xpdview import plot_analysis
+from xpdview.plot_analysis import ReducedRepPlot
+
+
+def _y_data(frames, func, executor=None):
+    keys = [str(i) for i in range(len(frames))]
+    rpp = ReducedRepPlot(dict(zip(keys, frames)), keys, None, None,
+                         {'func': func}, 'func', executor)
+    rpp.x_start, rpp.x_stop, rpp.y_start, rpp.y_stop = 1, 5, 2, 6
+    rpp.analyze()
+    return rpp.y_data
+
+
+def test_analyze_paths(monkeypatch):
+    rs = np.random.RandomState(0)
+    frames = [rs.rand(8, 8) for _ in range(5)]
+    expected = [np.std(frame[2:6, 1:5]) for frame in frames]
+    # stacked in process
+    assert np.allclose(_y_data(frames, np.std), expected)
+    # one by one in process
+    monkeypatch.setattr(plot_analysis, 'STACK_MAX_SIZE', 0)
+    frames = [frame.copy() for frame in frames]
+    assert np.allclose(_y_data(frames, lambda a: a.std()), expected)
+    # through shared memory in the executor
+    monkeypatch.setattr(plot_analysis, 'PARALLEL_MIN_SIZE', 0)
+    frames = [frame.copy() for frame in frames]
+    with ThreadPoolExecutor(2) as executor:
+        assert np.allclose(_y_data(frames, np.std, executor), expected)
@@ -0,0 +1,102 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from xpdview.cross_2d import StackViewer
+
+
+class DummyViewer:
+    def __init__(self, blit=False):
+        self._fig = plt.figure()
+        self.image = None
+        self.cached_stats = None
+        self.blit = blit
+
+    def update_image(self, image, cached_stats=False):
+        self.image = image
+        self.cached_stats = cached_stats
+        return self.blit
+
+
+def test_lazy_sources():
+    calls = []
+
+    def source(i):
+        def load():
+            calls.append(i)
+            return np.full((10, 10), i, dtype=float)
+        return load
+
+    viewer = DummyViewer()
+    # room for two 10x10 float frames
+    sv = StackViewer(viewer, cache_size=2 * 800, prefetch=0)
+    sv.update([str(i) for i in range(5)], [source(i) for i in range(5)],
+              refresh=True)
+    for i in (0, 1, 0, 2, 0, 1):
+        sv.slider.set_val(i)
+        assert np.all(viewer.image == i)
+        # statistics of frames read from sources are kept
+        assert viewer.cached_stats
+    # 1 was evicted by 2, 0 was kept as recently used
+    assert calls == [0, 1, 2, 1]
+    assert len(sv._cache) == 2
+
+
+def test_prefetch():
+    viewer = DummyViewer()
+    sv = StackViewer(viewer, prefetch=2)
+    sv.update([str(i) for i in range(10)],
+              [lambda i=i: np.full((10, 10), i) for i in range(10)],
+              refresh=True)
+    for i in (5, 4):
+        sv.slider.set_val(i)
+    # moving backwards, read 3, 2 ahead and 5 behind
+    for future in list(sv._prefetching.values()):
+        future.result()
+    assert {2, 3, 4, 5} <= set(sv._cache)
+    sv.slider.set_val(3)
+    assert np.all(viewer.image == 3)
+
+
+def test_update_in_place():
+    viewer = DummyViewer()
+    sv = StackViewer(viewer)
+    imgs = [np.full((10, 10), i) for i in range(3)]
+    sv.update(['0', '1'], imgs[:2], refresh=True)
+    slider = sv.slider
+    sv.update(['2'], imgs[2:])
+    assert sv.slider is slider
+    assert sv.slider.valmax == 2
+    # images are shown as given, no copies
+    assert viewer.image is imgs[1]
+    # and may have changed, their statistics are dropped
+    assert not viewer.cached_stats
+
+
+def test_blitted_frames():
+    viewer = DummyViewer(blit=True)
+    sv = StackViewer(viewer)
+    sv.update(['a', 'b'], [np.zeros((10, 10))] * 2, refresh=True)
+    canvas = viewer._fig.canvas
+    canvas.draw()
+    draws = []
+    canvas.mpl_connect('draw_event', draws.append)
+    sv.slider.set_val(1)
+    # title and slider are blitted, no full redraw
+    assert not draws
+    assert sv._title.get_text() == 'b'
+    assert sv.slider.valtext.get_text() == '1/1'
+
+
+def test_mapped_frames(tmpdir):
+    fn_list = []
+    for i in range(5):
+        fn = str(tmpdir.join('{}.npy'.format(i)))
+        np.save(fn, np.full((10, 10), i, dtype=float))
+        fn_list.append(fn)
+    viewer = DummyViewer()
+    # memory-mapped frames are limited in number, not in bytes
+    sv = StackViewer(viewer, cache_size=0, mapped_frames=2, prefetch=0)
+    sv.update([str(i) for i in range(5)], fn_list, refresh=True)
+    for i in range(5):
+        sv.slider.set_val(i)
+        assert np.all(viewer.image == i)
+    assert list(sv._cache) == [3, 4] and sv._cache_mapped == 2
@@ -0,0 +1,19 @@
+import numpy as np
+from tifffile import imwrite
+from xpdview.Tif_File_Finder import TifFileFinder
+
+
+def test_get_new_files(tmpdir):
+    for i in range(3):
+        imwrite(str(tmpdir.join('{}.tif'.format(i))), np.full((4, 4), i))
+    imwrite(str(tmpdir.join('0.dark.tif')), np.zeros((4, 4)))
+    finder = TifFileFinder(n_workers=2)
+    finder._directory_name = str(tmpdir)
+    finder.get_file_list()
+    assert sorted(finder.file_list) == ['0.tif', '1.tif', '2.tif']
+    assert len(finder.pic_list) == 3
+    imwrite(str(tmpdir.join('3.tif')), np.full((4, 4), 3))
+    names, pics = finder.get_new_files()
+    assert names == ['3.tif']
+    assert np.all(pics[0] == 3) and finder.pic_list[-1] is pics[0]
+    assert finder.get_new_files() == ([], [])
@@ -0,0 +1,136 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from xpdview.utils import (DirectoryIndex, ReducedCache, load_files,
+                           reduced_read, export_stack, open_stack,
+                           shared_read, from_shared)
+
+
+def test_directory_index(tmpdir):
+    for fn in ('b.tif', 'a.tif', 'Q_a.chi', 'Q_b.chi', 'c.txt'):
+        tmpdir.join(fn).write('')
+    index = DirectoryIndex(str(tmpdir))
+    added, removed = index.update()
+    assert len(added) == 5 and not removed
+    assert index.names('.tif') == ['a.tif', 'b.tif']
+    for fn in ('d.tif', '0.tif', 'Q_0.chi'):
+        tmpdir.join(fn).write('')
+    os.remove(str(tmpdir.join('b.tif')))
+    added, removed = index.update()
+    assert added == {'d.tif', '0.tif', 'Q_0.chi'} and removed == {'b.tif'}
+    assert index.names('.tif') == ['0.tif', 'a.tif', 'd.tif']
+    assert index.names('.chi') == ['Q_0.chi', 'Q_a.chi', 'Q_b.chi']
+
+
+def test_load_files(tmpdir):
+    for fn in ('a.tif', 'b.tif', 'Q_a.chi', 'Q_b.chi'):
+        tmpdir.join(fn).write('')
+    keys, operations, unit = load_files(str(tmpdir), '.tif', '.chi', 'Q_')
+    assert keys == ['a', 'b']
+    assert list(operations) == [('a.tif', 'Q_a.chi'), ('b.tif', 'Q_b.chi')]
+    tmpdir.join('c.tif').write('')
+    keys, operations, unit = load_files(str(tmpdir), '.tif', '.chi', 'Q_')
+    assert keys == ['a', 'b', 'c']
+    assert list(operations) == ['a.tif', 'b.tif', 'c.tif']
+
+
+def test_reduced_read(tmpdir):
+    data = np.random.rand(50, 2)
+    headers = {'xpdan.chi': '# q I\n##\n',
+               'fit2d.chi': 'img.tif\n2-Theta Angle (Degrees)\nIntensity\n'
+                            '       50\n',
+               'xpdfsuite.gr': ''.join('header {} = a\n'.format(i)
+                                       for i in range(27))}
+    for fn, header in headers.items():
+        with open(str(tmpdir.join(fn)), 'w') as f:
+            f.write(header)
+            np.savetxt(f, data)
+        array = reduced_read(str(tmpdir.join(fn)))
+        assert np.array_equal(array, data)
+        assert array[:, 1].flags.contiguous
+    # not a plain table, parsed by np.loadtxt
+    tmpdir.join('comments.chi').write('# q I\n1 2 # first\n3 4\n')
+    assert np.array_equal(reduced_read(str(tmpdir.join('comments.chi'))),
+                          [[1, 2], [3, 4]])
+
+
+def test_reduced_read_threads(tmpdir):
+    fn_list = []
+    for i in range(16):
+        fn = str(tmpdir.join('Q_{}.chi'.format(i)))
+        with open(fn, 'w') as f:
+            f.write('# q I\n')
+            np.savetxt(f, np.full((100, 2), i))
+        fn_list.append(fn)
+    filters = list(warnings.filters)
+    with ThreadPoolExecutor(4) as executor:
+        arrays = list(executor.map(reduced_read, fn_list))
+    # reading has to leave the warning filters of the process alone
+    assert warnings.filters == filters
+    assert all(np.array_equal(array, np.full((100, 2), i))
+               for i, array in enumerate(arrays))
+
+
+def test_reduced_cache(tmpdir):
+    for i in range(3):
+        np.savetxt(str(tmpdir.join('Q_{}.chi'.format(i))),
+                   np.full((5, 2), i))
+    fns = [str(tmpdir.join('Q_{}.chi'.format(i))) for i in range(3)]
+    cache = ReducedCache(str(tmpdir))
+    arrays = [cache.read(fn) for fn in fns]
+    cache.save()
+    calls = []
+
+    def reader(fn):
+        calls.append(fn)
+        return reduced_read(fn)
+
+    cache = ReducedCache(str(tmpdir))
+    for fn, array in zip(fns, arrays):
+        assert np.array_equal(cache.read(fn, reader), array)
+    assert not calls
+    # changed files are parsed again
+    np.savetxt(fns[0], np.ones((4, 2)))
+    os.utime(fns[0], (0, 0))
+    assert cache.read(fns[0], reader).shape == (4, 2)
+    assert calls == fns[:1]
+
+
+def test_reduced_cache_corrupt(tmpdir):
+    fn = str(tmpdir.join('Q_0.chi'))
+    np.savetxt(fn, np.ones((5, 2)))
+    cache = ReducedCache(str(tmpdir))
+    cache.read(fn)
+    cache.save()
+    # a truncated cache is parsed again and rewritten
+    with open(cache.cache_fn, 'r+b') as f:
+        f.truncate(os.path.getsize(cache.cache_fn) // 2)
+    cache = ReducedCache(str(tmpdir))
+    assert np.array_equal(cache.read(fn), np.ones((5, 2)))
+    cache.save()
+    assert ReducedCache(str(tmpdir))._entries
+    assert [f for f in os.listdir(str(tmpdir))
+            if f.endswith('.tmp')] == []
+
+
+def test_stack_roundtrip(tmpdir):
+    fn = str(tmpdir.join('stack.npz'))
+    imgs = [np.full((4, 3), i) for i in range(3)]
+    int_data = [(np.arange(5.), np.ones(5)), (np.arange(2.), np.zeros(2))]
+    for compress in (False, True):
+        export_stack(fn, ['a', 'b', 'c'], imgs[:2] + [lambda: imgs[2]],
+                     ['a', 'b'], int_data, ('x', 'y'), compress=compress)
+        keys, img_list, int_keys, int_list, unit = open_stack(fn)
+        assert keys == ['a', 'b', 'c'] and int_keys == ['a', 'b']
+        assert all(np.array_equal(img(), ref)
+                   for img, ref in zip(img_list, imgs))
+        assert all(np.array_equal(x, ref_x) and np.array_equal(y, ref_y)
+                   for (x, y), (ref_x, ref_y) in zip(int_list, int_data))
+        assert unit == ('x', 'y')
+
+
+def test_shared_roundtrip():
+    img = np.arange(12, dtype=np.uint16).reshape(3, 4)
+    out = from_shared(*shared_read(lambda fn: img, 'img.tif'))
+    assert out.dtype == img.dtype and np.array_equal(out, img)
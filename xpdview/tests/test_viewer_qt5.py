@@ -0,0 +1,57 @@
+import os
+import time
+import numpy as np
+import pytest
+from tifffile import imwrite
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+from xpdview.viewer_qt5 import XpdView
+
+
+@pytest.fixture(scope='module')
+def app():
+    return (QtWidgets.QApplication.instance() or
+            QtWidgets.QApplication(['test']))
+
+
+def _write_files(tmpdir, n):
+    for i in range(n):
+        imwrite(str(tmpdir.join('img_{}.tif'.format(i))),
+                np.full((20, 20), i, dtype=np.float32))
+        np.savetxt(str(tmpdir.join('Q_img_{}.chi'.format(i))),
+                   np.column_stack([np.arange(10.), np.full(10, i)]))
+
+
+def _wait_loaded(viewer, app, timeout=30):
+    deadline = time.monotonic() + timeout
+    while viewer._load_timer.isActive():
+        assert time.monotonic() < deadline
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_background_loading(tmpdir, app):
+    _write_files(tmpdir, 6)
+    viewer = XpdView(str(tmpdir))
+    viewer.cache_reduced_data = False
+    viewer.set_path(refresh=True)
+    _wait_loaded(viewer, app)
+    keys = ['img_{}'.format(i) for i in range(6)]
+    # shown in file order, whatever order the threads finished in
+    assert viewer.viewer.key_list == keys
+    assert viewer.waterfall.key_list == keys
+    for i in range(6):
+        assert np.all(viewer.viewer.get_frame(i) == i)
+        assert np.all(viewer.waterfall._curves.y(i) == i)
+    # a cancelled load shows nothing more, files read before the
+    # cancellation may have been shown already
+    viewer.set_path(refresh=True)
+    viewer.cancel_loading()
+    shown = list(viewer.viewer.key_list)
+    assert not viewer._pending and not viewer._load_timer.isActive()
+    for _ in range(20):
+        app.processEvents()
+        time.sleep(0.01)
+    assert viewer.viewer.key_list == shown
+    viewer.close()
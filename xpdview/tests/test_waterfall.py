@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from xpdview.waterfall import Waterfall
+from xpdview.waterfall import (Waterfall, CollectionWaterfall, CurveBuffer,
+                               minmax_decimate)
 
 fig = plt.figure('test_title')
 unit = ('x unit', 'y unit')
@@ -17,3 +18,66 @@ p2 = Waterfall(fig, key_list=key_list, int_data_list=int_data_list,
                unit=unit)
 
 plt.show()
+
+
+def test_update_offsets():
+    wf = Waterfall()
+    for i in range(5):
+        wf.update([str(i)], [(x, (i + 1) * np.sin(x))])
+    for val in (0.1, 0.5):
+        wf.y_offset_slider.set_val(val)
+        for i, line in enumerate(wf.ax.get_lines()):
+            assert np.allclose(line.get_ydata(),
+                               wf.y_array_list[i] + wf.ydist * i * val)
+
+
+def test_collection_waterfall():
+    wf = CollectionWaterfall(chunk_size=2)
+    ref = Waterfall()
+    for i in range(5):
+        for w in (wf, ref):
+            w.update([str(i)], [(x, (i + 1) * np.sin(x))])
+    assert len(wf._collections) == 3
+    for i, line in enumerate(ref.ax.get_lines()):
+        seg = wf._segments[i // 2][i % 2]
+        assert np.allclose(seg, line.get_xydata())
+    assert np.allclose(wf.ax.get_ylim(), ref.ax.get_ylim())
+
+
+def test_curve_buffer():
+    buf = CurveBuffer()
+    for i in range(20):
+        buf.append(x, i * x)
+    assert buf.x_grid is not None
+    assert buf.y_block(0, 20).shape == (20, len(x))
+    assert np.allclose(buf.y(3), 3 * x)
+    # a new grid falls back to separate arrays
+    buf.append(x[:10], x[:10])
+    assert buf.x_grid is None
+    assert len(buf) == 21
+    assert np.allclose(buf.y(3), 3 * x)
+    assert np.allclose(buf.x(20), x[:10])
+
+
+def test_minmax_decimate():
+    y = np.random.rand(3, 1003)
+    xx = np.arange(1003)
+    x_dec, y_dec = minmax_decimate(xx, y, 10)
+    assert y_dec.shape == (3, 2 * 100 + 3)
+    assert np.allclose(y_dec.max(axis=1), y.max(axis=1))
+    assert np.allclose(y_dec.min(axis=1), y.min(axis=1))
+    assert np.all(np.diff(x_dec, axis=1) > 0)
+    assert np.allclose(np.take_along_axis(y, x_dec, axis=1), y_dec)
+
+
+def test_max_curves():
+    wf = Waterfall(max_curves=3)
+    for i in range(7):
+        wf.update([str(i)], [(x, i + np.sin(x))])
+    assert wf.key_list == ['4', '5', '6']
+    assert len(wf.ax.get_lines()) == 3
+    for line in wf.ax.get_lines():
+        i = int(line.get_label())
+        assert np.allclose(line.get_ydata(),
+                           i + np.sin(x) + wf.ydist * i * 0.1)
+    assert wf._curves.y_block(4, 7).shape == (3, len(x))
@@ -1,6 +1,25 @@
 """module to provide file-based I/O function"""
 import os
+import time
+import bisect
+import hashlib
+import io
+import tempfile
+import threading
+import zipfile
+from functools import partial
+from multiprocessing import shared_memory
 import numpy as np
+from tifffile import imread, memmap
+
+# name of the binary cache of reduced data written to data directories, and
+# where it goes if they are read-only
+REDUCED_CACHE_FN = '.xpdview_reduced.npz'
+USER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'xpdview')
+# directories whose modification time is this recent, in seconds, are
+# rescanned anyway as files created within the time resolution of the file
+# system would be missed
+RACY_MTIME = 2
 
 
 def conf_label_size(ax, label_size):
@@ -15,6 +34,57 @@ def conf_tick_size(ax, tick_size):
                 tick.label.set_fontsize(tick_size)
 
 
+def _is_data_line(line):
+    """whether a line holds at least two numbers, up to a comment"""
+    tokens = line.split(b'#')[0].split()
+    if len(tokens) < 2:
+        return False
+    try:
+        for token in tokens:
+            float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def reduced_read(fn):
+    """read 1d reduced data from .chi or .gr files
+
+    The header is everything before the first line of at least two
+    numbers, which covers the fit2d, xpdAn, pyFAI and xPDFsuite formats.
+    The file is read once and the numbers after the header are parsed by
+    ``np.loadtxt``.
+
+    Parameters
+    ----------
+    fn : str
+        filename of the reduced data
+
+    Returns
+    -------
+    array : ndarray
+        n by m array of floats, with contiguous columns. first column is
+        the data grid, second column is the data values
+    """
+    with open(fn, 'rb') as f:
+        data = f.read()
+    start = 0
+    n_header = 0
+    while start < len(data):
+        stop = data.find(b'\n', start)
+        if stop < 0:
+            stop = len(data)
+        line = data[start:stop]
+        if _is_data_line(line):
+            break
+        start = stop + 1
+        n_header += 1
+    else:
+        return np.empty((0, 2))
+    return np.asfortranarray(
+        np.loadtxt(io.BytesIO(data), skiprows=n_header, ndmin=2))
+
+
 def chi_read(fn, skiprows=4):
     """wrapper for reading .chi files
 
@@ -23,19 +93,185 @@ def chi_read(fn, skiprows=4):
     fn : str
         filename of .chi files
     skiprows : int, optional
-        number of rows will be skipped.
-        default to 4 for fit2d format
+        not used anymore, the header is detected by ``reduced_read``
 
     Return
     ------
     array : ndarray
         n by 2 array. first row is data grid, second row is data values
     """
+    return reduced_read(fn)
+
+
+def tif_read(fn, mmap=True):
+    """wrapper for reading tif files
+
+    Parameters
+    ----------
+    fn : str
+        filename of the tif file
+    mmap : bool, optional
+        option to memory-map the file, so pixels are only read when they
+        are used. Compressed or tiled files can't be mapped and are read
+        into memory. default to True
+
+    Return
+    ------
+    array : ndarray
+        the image, a read-only numpy.memmap if mapped
+    """
+    if mmap:
+        try:
+            return memmap(fn, mode='r')
+        except ValueError:
+            # image data are not memory-mappable
+            pass
+    return imread(fn)
+
+
+def shared_read(reader, fn):
+    """read an image into shared memory, to be run in another process
+
+    Parameters
+    ----------
+    reader : callable
+        function reading the image, it has to be picklable
+    fn : str
+        filename of the image
+
+    Returns
+    -------
+    (name, shape, dtype) : tuple
+        description of the image for ``from_shared``
+    """
+    img = np.asarray(reader(fn))
+    shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+    np.ndarray(img.shape, img.dtype, buffer=shm.buf)[...] = img
+    shm.close()
+    return shm.name, img.shape, img.dtype.str
+
+
+def from_shared(name, shape, dtype):
+    """take an image out of shared memory written by ``shared_read``
+
+    The image is copied and the shared memory is freed.
+    """
+    shm = shared_memory.SharedMemory(name=name)
     try:
-        array =np.loadtxt(fn)
-    except:
-        array = np.loadtxt(fn, skiprows=skiprows)
-    return array
+        img = np.ndarray(shape, dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return img
+
+
+def read_image(fn, mmap=True):
+    """read a 2d image from a .npy or tif file
+
+    Parameters
+    ----------
+    fn : str
+        filename of the image
+    mmap : bool, optional
+        option to memory-map the file if possible. default to True
+
+    Return
+    ------
+    array : ndarray
+        the image
+    """
+    if os.path.splitext(fn)[1] == '.npy':
+        return np.load(fn, mmap_mode='r' if mmap else None)
+    return tif_read(fn, mmap)
+
+
+class DirectoryIndex:
+    """names of the files in a directory, updated incrementally
+
+    The directory is listed with a single ``os.scandir`` pass, and only
+    again once its modification time changed. Updates may come from
+    several threads.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the directory
+
+    Attributes
+    ----------
+    fn_set : set
+        names of the files in the directory
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.fn_set = set()
+        self._by_ext = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def update(self):
+        """list the directory again if it changed
+
+        Returns
+        -------
+        (added, removed) : tuple of set
+            names added to and removed from the directory
+        """
+        with self._lock:
+            mtime = os.stat(self.filepath).st_mtime
+            if mtime == self._mtime and time.time() - mtime > RACY_MTIME:
+                return set(), set()
+            self._mtime = mtime
+            with os.scandir(self.filepath) as it:
+                fn_set = set(entry.name for entry in it)
+            added = fn_set - self.fn_set
+            removed = self.fn_set - fn_set
+            self.fn_set = fn_set
+            if len(added) + len(removed) > len(fn_set) // 2:
+                # mostly new, sort from scratch
+                self._by_ext = {}
+                for fn in sorted(fn_set):
+                    ext = os.path.splitext(fn)[1]
+                    self._by_ext.setdefault(ext, []).append(fn)
+                return added, removed
+            for fn in removed:
+                fn_list = self._by_ext[os.path.splitext(fn)[1]]
+                del fn_list[bisect.bisect_left(fn_list, fn)]
+            for fn in added:
+                ext = os.path.splitext(fn)[1]
+                bisect.insort(self._by_ext.setdefault(ext, []), fn)
+            return added, removed
+
+    def names(self, ext):
+        """sorted names of the files with extension ``ext``"""
+        with self._lock:
+            return list(self._by_ext.get(ext, ()))
+
+
+_directory_index = {}
+_directory_index_lock = threading.Lock()
+
+
+def directory_index(filepath):
+    """the up to date index of a directory, kept between calls
+
+    Parameters
+    ----------
+    filepath : str
+        path to the directory
+
+    Returns
+    -------
+    index : DirectoryIndex
+    """
+    key = os.path.abspath(filepath)
+    with _directory_index_lock:
+        index = _directory_index.get(key)
+        if index is None:
+            index = _directory_index[key] = DirectoryIndex(filepath)
+    index.update()
+    return index
 
 
 def load_files(filepath, img_data_ext, int_data_ext,
@@ -59,12 +295,15 @@ def load_files(filepath, img_data_ext, int_data_ext,
     Returns
     -------
     (img_key_list, operation_list, unit)
+
+    The directory is read through ``directory_index``, so repeated calls
+    only list it again when it changed.
     """
     unit = None # update later
     int_data_fn_list = None # update later
-    sorted_fn_list = sorted(os.listdir(filepath))
-    img_data_fn_list = [f for f in sorted_fn_list\
-                        if os.path.splitext(f)[1] == img_data_ext]
+    index = directory_index(filepath)
+    fn_set = index.fn_set
+    img_data_fn_list = index.names(img_data_ext)
     if not img_data_fn_list:
         print("INFO: can't find 2d image data with extension = {} "
               "in directory = {}".format(img_data_ext, filepath))
@@ -78,7 +317,7 @@ def load_files(filepath, img_data_ext, int_data_ext,
         gr_fn_list = []
         for fn in img_key_list:
             gr_fn = ''.join([fn, int_data_ext])
-            if os.path.isfile(os.path.join(filepath, gr_fn)):
+            if gr_fn in fn_set:
                 gr_fn_list.append(gr_fn)
         # check if valid
         if len(gr_fn_list) == len(img_key_list):
@@ -91,10 +330,10 @@ def load_files(filepath, img_data_ext, int_data_ext,
         fit2d_fn_list = []
         for fn in img_key_list:
             Q_fn = ''.join([int_data_prefix, fn, int_data_ext])
-            if os.path.isfile(os.path.join(filepath, Q_fn)):
+            if Q_fn in fn_set:
                 Q_fn_list.append(Q_fn)
             fit2d_fn = ''.join([fn, int_data_ext])
-            if os.path.isfile(os.path.join(filepath, fit2d_fn)):
+            if fit2d_fn in fn_set:
                 fit2d_fn_list.append(fit2d_fn)
         # check if 1d data list is valid
         if not Q_fn_list and not fit2d_fn_list:
@@ -133,3 +372,213 @@ def load_files(filepath, img_data_ext, int_data_ext,
         operation_list = img_data_fn_list
 
     return (img_key_list, operation_list, unit)
+
+
+class ReducedCache:
+    """binary cache of the reduced data files of a directory
+
+    Parsed arrays are kept in one .npz file, keyed by file name, size and
+    modification time, so the files of a directory opened before are read
+    back with a single binary read instead of parsing every file.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the directory
+    cache_fn : str, optional
+        filename of the cache. default to REDUCED_CACHE_FN in the
+        directory, or a file in USER_CACHE_DIR if it is read-only
+    """
+
+    def __init__(self, filepath, cache_fn=None):
+        self.filepath = filepath
+        if cache_fn is None:
+            if os.access(filepath, os.W_OK):
+                cache_fn = os.path.join(filepath, REDUCED_CACHE_FN)
+            else:
+                digest = hashlib.md5(
+                    os.path.abspath(filepath).encode()).hexdigest()
+                cache_fn = os.path.join(USER_CACHE_DIR, digest + '.npz')
+        self.cache_fn = cache_fn
+        # {name: (size, mtime, array)}
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        # saves may be submitted to several threads
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.cache_fn) as f:
+                names, stats, shapes, data = (f['names'], f['stats'],
+                                              f['shapes'], f['data'])
+        except (OSError, KeyError, ValueError, EOFError,
+                zipfile.BadZipFile) as e:
+            if os.path.exists(self.cache_fn):
+                print("INFO: can't read reduced data cache = {}: {}"
+                      .format(self.cache_fn, e))
+            return
+        offset = 0
+        for name, (size, mtime), (n_rows, n_cols) in zip(names, stats,
+                                                          shapes):
+            stop = offset + n_rows * n_cols
+            # stored column by column
+            array = data[offset:stop].reshape(n_cols, n_rows).T
+            self._entries[str(name)] = (size, mtime, array)
+            offset = stop
+
+    def read(self, fn, reader=None):
+        """read a reduced data file through the cache
+
+        Parameters
+        ----------
+        fn : str
+            filename of the reduced data, in the directory
+        reader : callable, optional
+            function parsing the file if it is not cached. default to
+            ``reduced_read``
+
+        Returns
+        -------
+        array : ndarray
+            n by m array of floats, with contiguous columns
+        """
+        name = os.path.basename(fn)
+        stat = os.stat(fn)
+        key = (stat.st_size, stat.st_mtime_ns)
+        entry = self._entries.get(name)
+        if entry is not None and entry[:2] == key:
+            return entry[2]
+        if reader is None:
+            reader = reduced_read
+        array = np.asfortranarray(reader(fn), dtype=float)
+        with self._lock:
+            self._entries[name] = key + (array,)
+            self._dirty = True
+        return array
+
+    def save(self):
+        """write the cache if files were parsed since the last save
+
+        Entries of files which are not in the directory anymore are
+        dropped.
+        """
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        fn_set = directory_index(self.filepath).fn_set
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            entries = sorted((name, entry) for name, entry
+                             in self._entries.items() if name in fn_set)
+        arrays = [array for name, (size, mtime, array) in entries]
+        tmp_fn = None
+        try:
+            cache_dir = os.path.dirname(self.cache_fn)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_fn = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f,
+                         names=np.array([name for name, entry in entries]),
+                         stats=np.array([entry[:2] for name, entry
+                                         in entries],
+                                        dtype=np.int64).reshape(-1, 2),
+                         shapes=np.array([array.shape for array in arrays],
+                                         dtype=np.int64).reshape(-1, 2),
+                         data=np.concatenate(
+                             [array.T.ravel() for array in arrays] +
+                             [np.empty(0)]))
+            # mkstemp makes the file private, other users read it too
+            os.chmod(tmp_fn, 0o644)
+            os.replace(tmp_fn, self.cache_fn)
+        except OSError as e:
+            print("INFO: can't write reduced data cache = {}: {}"
+                  .format(self.cache_fn, e))
+            if tmp_fn is not None and os.path.exists(tmp_fn):
+                os.remove(tmp_fn)
+
+
+def export_stack(fn, key_list, img_data_list, int_key_list=None,
+                 int_data_list=None, unit=None, compress=False):
+    """write images and reduced data into a single container file
+
+    The container is a .npz file with one member per image, so images can
+    be read one at a time by ``open_stack``.
+
+    Parameters
+    ----------
+    fn : str
+        filename of the container
+    key_list : list
+        keys of the images
+    img_data_list : list
+        images, or callables returning them. they are read one at a time
+    int_key_list : list, optional
+        keys of the reduced data
+    int_data_list : list, optional
+        (x, y) tuples of reduced data
+    unit : tuple, optional
+        (x_unit, y_unit) of the reduced data
+    compress : bool, optional
+        option to deflate the images and the reduced data. default to
+        False, uncompressed images are read faster
+    """
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(fn, mode='w', compression=compression,
+                         allowZip64=True) as zf:
+
+        def write(name, array):
+            with zf.open(name + '.npy', mode='w', force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(array),
+                                          allow_pickle=False)
+
+        write('keys', np.array(key_list, dtype=str))
+        for i, img in enumerate(img_data_list):
+            if callable(img):
+                img = img()
+            write('img_{:06d}'.format(i), img)
+        if int_data_list:
+            write('int_keys', np.array(int_key_list, dtype=str))
+            write('int_lengths', [len(x) for x, y in int_data_list])
+            write('int_x', np.concatenate([x for x, y in int_data_list]))
+            write('int_y', np.concatenate([y for x, y in int_data_list]))
+        if unit is not None:
+            write('unit', np.array(unit, dtype=str))
+
+
+def _read_member(npz, name):
+    return npz[name]
+
+
+def open_stack(fn):
+    """open a container written by ``export_stack``
+
+    Images are returned as callables reading them from the file, so they
+    are only read when shown.
+
+    Parameters
+    ----------
+    fn : str
+        filename of the container
+
+    Returns
+    -------
+    (key_list, img_data_list, int_key_list, int_data_list, unit)
+    """
+    npz = np.load(fn)
+    key_list = npz['keys'].tolist()
+    img_data_list = [partial(_read_member, npz, 'img_{:06d}'.format(i))
+                     for i in range(len(key_list))]
+    int_key_list = []
+    int_data_list = []
+    if 'int_keys' in npz.files:
+        int_key_list = npz['int_keys'].tolist()
+        bounds = np.cumsum(npz['int_lengths'])[:-1]
+        int_data_list = list(zip(np.split(npz['int_x'], bounds),
+                                 np.split(npz['int_y'], bounds)))
+    unit = tuple(npz['unit'].tolist()) if 'unit' in npz.files else None
+    return key_list, img_data_list, int_key_list, int_data_list, unit
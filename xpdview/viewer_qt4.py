@@ -25,13 +25,13 @@ from matplotlib.backends.backend_qt4agg import\
 # classes for plotting
 from xpdview.cross_2d import CrossSection, StackViewer
 from xpdview.waterfall import Waterfall
-from xpdview.utils import load_files, chi_read
+from xpdview.utils import load_files, chi_read, reduced_read
 
 # top definitions for IO handlers
 TIF_READER = partial(imread)
 NPY_READER = partial(np.load)
 CHI_READER = partial(chi_read) # special as we still take fit2d
-GR_READER = partial(np.loadtxt, skiprows=27)  # skiprows=27 -> xPDFsuite
+GR_READER = partial(reduced_read)  # header detected, e.g. xPDFsuite
 
 class XpdView(QtGui.QMainWindow):
     def __init__(self, filepath=None):
@@ -170,8 +170,6 @@ class XpdView(QtGui.QMainWindow):
         # TODO: detailed flag about update status in each class
         self.viewer.update(key_list, img_data_list, refresh)
         self.waterfall.update(key_list, int_data_list, refresh)
-        # link callback again
-        self.viewer.slider.on_changed(self.update_one_dim_plot)
         self.update_one_dim_plot(int(round(self.viewer.slider.val)))
 
     def set_path(self, refresh=False):
@@ -3,14 +3,17 @@ This file will contain the code that makes the XPD view GUI
 """
 import os
 import sys
+import multiprocessing
 from functools import partial
-from collections import Iterable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import deque
 
 import numpy as np
 from tifffile import imread
 
 import matplotlib
-matplotlib.use('qt5Agg')
+# the canvases are embedded, pyplot may keep another backend if it has one
+matplotlib.use('qt5Agg', force=False)
 from matplotlib.figure import Figure
 from PyQt5 import QtCore, QtWidgets
 from matplotlib.backends.backend_qt5agg import\
@@ -21,13 +24,27 @@ from matplotlib.backends.backend_qt5agg import\
 # classes for plotting
 from xpdview.cross_2d import CrossSection, StackViewer
 from xpdview.waterfall import Waterfall
-from xpdview.utils import chi_read, load_files
+from xpdview.utils import (chi_read, reduced_read, load_files, tif_read,
+                           directory_index, ReducedCache, export_stack,
+                           open_stack, shared_read, from_shared)
 
 # top definitions for IO handlers
 TIF_READER = partial(imread)
 NPY_READER = partial(np.load)
+# memory-mapped image handlers, pixels are read when they are used
+TIF_MMAP_READER = partial(tif_read, mmap=True)
+NPY_MMAP_READER = partial(np.load, mmap_mode='r')
+# eager reads keep every image, mapping them would hold a file descriptor
+# per image
+UNMAPPED_READERS = {TIF_MMAP_READER: TIF_READER, NPY_MMAP_READER: NPY_READER}
 CHI_READER = partial(chi_read) # special as we still take fit2d
-GR_READER = partial(np.loadtxt, skiprows=27)  # skiprows=27 -> xPDFsuite
+GR_READER = partial(reduced_read)  # header detected, e.g. xPDFsuite
+
+# number of threads reading files and max number of files shown per refresh
+LOAD_WORKERS = 4
+LOAD_CHUNK = 50
+# time between scans of a watched directory, in ms
+WATCH_INTERVAL = 1000
 
 class XpdView(QtWidgets.QMainWindow):
     def __init__(self, filepath=None):
@@ -53,12 +70,35 @@ class XpdView(QtWidgets.QMainWindow):
         img_handler : object
             function to load 2d image from different library options
             are tifffile.imread or numpy.load. default to tifffile.imread
+        mmap_images : bool
+            option to memory-map .npy and uncompressed tif images instead
+            of reading them into memory, when they are read lazily.
+            default to True
         viewer : xpdView.cross2d.StackViewer
             instance of 2d stack viewer which carries key_list and
             img_data_list
         waterfall : xpdView.waterfall.Waterfall
             instance of waterfall plotting class which carries key_list
             and int_data_list
+        n_workers : int
+            number of threads reading files in the background. default to
+            LOAD_WORKERS
+        lazy_images : bool
+            option to read images only when they are shown, keeping a
+            bounded cache of frames in the stack viewer. default to True
+        decode_processes : int
+            number of processes decoding images when lazy_images is False,
+            passing them back through shared memory. Each process is fed
+            by a loading thread, so more than n_workers are not used. 0 to
+            decode in the loading threads, where tifffile releases the GIL
+            for most codecs. img_handler has to be picklable. default to 0
+        cache_reduced_data : bool
+            option to keep parsed reduced data in a binary file of the
+            directory, read back instead of the text files next time.
+            default to True
+        watching : bool
+            whether new files written to the directory are appended as
+            they are found, see ``watch``
         """
         # configure QT property
         QtWidgets.QMainWindow.__init__(self)
@@ -70,10 +110,39 @@ class XpdView(QtWidgets.QMainWindow):
         self.filepath = filepath
         self.img_data_ext = '.tif'
         self.int_data_ext = '.chi'
-        self.img_handler = TIF_READER  # default to tifffile.imread
+        self.mmap_images = True
+        self.img_handler = TIF_MMAP_READER  # default to tifffile.memmap
         self.int_data_handler = CHI_READER
         self.int_data_prefix = 'Q_'  # NO ROOM FOR CHANGE, HAHAHA
 
+        # background file loading, results are collected in file order
+        # by a timer on the gui thread
+        self.n_workers = LOAD_WORKERS
+        self.lazy_images = True
+        self.cache_reduced_data = True
+        self._reduced_cache = None
+        # whether the cache is written once the ongoing load is done
+        self._save_cache = False
+        self.decode_processes = 0
+        self._process_pool = None
+        self._executor = None
+        self._pending = deque()
+        self._n_loaded = 0
+        self._load_timer = QtCore.QTimer(self)
+        self._load_timer.setInterval(100)
+        self._load_timer.timeout.connect(self._collect_loaded)
+
+        # watching the directory for new files. the file system watcher
+        # reacts fast on local disks, the timer also covers network ones
+        self._known_keys = set()
+        self._int_fn_prefix = None
+        self._candidates = {}
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_scan)
+        self._watch_timer = QtCore.QTimer(self)
+        self._watch_timer.setInterval(WATCH_INTERVAL)
+        self._watch_timer.timeout.connect(self.scan_new_files)
+
         # init mpl figures and canvas for plotting
         self.img_fig = Figure(tight_layout=True)
         self.img_canvas = FigureCanvas(self.img_fig)
@@ -157,23 +226,28 @@ class XpdView(QtWidgets.QMainWindow):
         ax.set_facecolor('k')
 
     def update(self, key_list=None, img_data_list=None,
-               int_data_list=None, refresh=False):
+               int_data_list=None, refresh=False, follow=True):
         """method to update data carried by class"""
         # key_list is required
         # call update methods of each class
         print("INFO: new key len = {}, img_data len = {}"
               .format(len(key_list), len(img_data_list)))
         # FIXME: detailed flag about update status in each class
-        self.viewer.update(key_list, img_data_list, refresh)
-        self.waterfall.update(key_list, int_data_list, refresh)
-        # link callback again
-        self.viewer.slider.on_changed(self.update_one_dim_plot)
+        self.viewer.update(key_list, img_data_list, refresh, follow=follow)
+        if refresh:
+            self.waterfall.clear()
+        if int_data_list:
+            self.waterfall.update(key_list, int_data_list)
         self.update_one_dim_plot(int(round(self.viewer.slider.val)))
 
     def set_path(self, refresh=False):
         """
         This creates the dialog window that pops up to set the path
 
+        Files are read by a thread pool in the background. The first ones
+        are shown as soon as they are read, the rest are appended in
+        chunks. Setting a new path cancels the ongoing load.
+
         Parameters
         ----------
         refresh : bool, optional
@@ -182,36 +256,288 @@ class XpdView(QtWidgets.QMainWindow):
         if not refresh:
             popup = QtWidgets.QFileDialog()
             self.filepath = popup.getExistingDirectory()
+        self.cancel_loading()
+        self._known_keys = set()
+        self._int_fn_prefix = None
+        self._n_loaded = 0
+        if self.watching:
+            self.watch(True)
         fn_meta = load_files(self.filepath, self.img_data_ext,
                              self.int_data_ext, self.int_data_prefix)
         if not all(fn_meta):
             self.viewer.no_image_plot()
             # call update method to turn 2d and 1d plot into black screen
-            self.waterfall.update([], [], True)
+            self.waterfall.clear()
             self.update_one_dim_plot(0)
             return
         # unpack results
         img_key_list, operation_list, unit = fn_meta
+        operation_list = list(operation_list)
         self.waterfall.unit = unit
-        key_list = img_key_list  # always use key_list from img data
+        # remember how reduced data are named, for files written later
+        if not isinstance(operation_list[0], str):
+            int_fn = operation_list[0][1]
+            self._int_fn_prefix = int_fn[:len(int_fn) -
+                                         len(img_key_list[0]) -
+                                         len(self.int_data_ext)]
+        self._known_keys.update(img_key_list)
+        self._load(img_key_list, operation_list)
+
+    def _load(self, key_list, operation_list, save_cache=True):
+        """read files in the background, after the pending ones
+
+        The reduced data cache is written once loading is done if
+        save_cache, otherwise only when the directory changes or the
+        viewer is closed, as watched files come in small batches.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.n_workers)
+        int_data_handler = self.int_data_handler
+        if (self._reduced_cache is not None and
+                self._reduced_cache.filepath != self.filepath):
+            self._executor.submit(self._reduced_cache.save)
+            self._reduced_cache = None
+        if self.cache_reduced_data and self._reduced_cache is None:
+            # only the cache of the current directory is kept in memory
+            self._reduced_cache = ReducedCache(self.filepath)
+        self._save_cache = self._save_cache or save_cache
+        if self.cache_reduced_data:
+            int_data_handler = partial(self._reduced_cache.read,
+                                       reader=int_data_handler)
+        decode_pool = None
+        if self.decode_processes and not self.lazy_images:
+            if self._process_pool is None:
+                # fresh interpreters, forking a gui process is not safe
+                self._process_pool = ProcessPoolExecutor(
+                    self.decode_processes,
+                    mp_context=multiprocessing.get_context('spawn'))
+            decode_pool = self._process_pool
+        img_handler = self.img_handler
+        if not self.lazy_images:
+            img_handler = UNMAPPED_READERS.get(img_handler, img_handler)
+        # bind path and handlers now, they may change while loading
+        load = partial(self._load_one, self.filepath, img_handler,
+                       int_data_handler, self.lazy_images,
+                       decode_pool=decode_pool)
+        # always use key_list from img data
+        self._pending.extend(
+            (key, self._executor.submit(load, meta))
+            for key, meta in zip(key_list, operation_list))
+        self._load_timer.start()
+        self._collect_loaded()
+
+    @staticmethod
+    def _load_one(filepath, img_handler, int_data_handler, lazy, meta,
+                  decode_pool=None):
+        """read image and reduced data of one entry of operation_list
+
+        If lazy, the image is returned as a callable reading it. Otherwise
+        it is decoded in decode_pool if given."""
+        int_data = None
+        if not isinstance(meta, str):
+            # iterable -> comes from zip(...)
+            img_fn, int_fn = meta
+            _array = int_data_handler(os.path.join(filepath, int_fn))
+            int_data = (_array[:, 0], _array[:, 1])
+        else:
+            # always load img data
+            img_fn = meta
+        if lazy:
+            img = partial(img_handler, os.path.join(filepath, img_fn))
+        elif decode_pool is not None:
+            img = from_shared(*decode_pool.submit(
+                shared_read, img_handler,
+                os.path.join(filepath, img_fn)).result())
+        else:
+            img = img_handler(os.path.join(filepath, img_fn))
+        return img, int_data
+
+    def _collect_loaded(self):
+        """show files read so far, in order"""
+        key_list = []
         img_data_list = []
         int_data_list = []
-        for meta in operation_list:
-            if not isinstance(meta, str):
-                # iterable -> comes from zip(...)
-                img_fn, int_fn = meta
-                _array = self.int_data_handler(os.path.join(self.filepath,
-                                                            int_fn))
-                x = _array[:,0]
-                y = _array[:,1]
-                int_data_list.append((x, y))
+        while (self._pending and self._pending[0][1].done()
+               and len(key_list) < LOAD_CHUNK):
+            key, future = self._pending.popleft()
+            try:
+                img, int_data = future.result()
+            except Exception as e:
+                print("INFO: can't read files of {}: {}".format(key, e))
+                continue
+            key_list.append(key)
+            img_data_list.append(img)
+            if int_data is not None:
+                int_data_list.append(int_data)
+        if key_list:
+            # file-based operation; first chunk refreshes
+            self.update(key_list, img_data_list, int_data_list,
+                        refresh=not self._n_loaded, follow=False)
+            self._n_loaded += len(key_list)
+        if self._pending:
+            self.statusBar().showMessage(
+                "Loading {}/{} files".format(
+                    self._n_loaded, self._n_loaded + len(self._pending)))
+        else:
+            self._load_timer.stop()
+            if self._reduced_cache is not None and self._save_cache:
+                self._executor.submit(self._reduced_cache.save)
+            self._save_cache = False
+            self.statusBar().showMessage(
+                "Loaded {} files".format(self._n_loaded), 3000)
+
+    def cancel_loading(self):
+        """stop showing files of the ongoing load"""
+        self._load_timer.stop()
+        for key, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+
+    def closeEvent(self, event):
+        self.cancel_loading()
+        if self._executor is not None:
+            if self._reduced_cache is not None:
+                # finished before the interpreter exits
+                self._executor.submit(self._reduced_cache.save)
+            self._executor.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+        super().closeEvent(event)
+
+    @property
+    def watching(self):
+        return self._watch_timer.isActive()
+
+    def watch(self, enable=True):
+        """option to append new files of the directory as they are written
+
+        Only the new files are read, once their size and modification
+        time are the same at two scans. When reduced data were found in
+        the directory, an image waits for its reduced data file.
+
+        Parameters
+        ----------
+        enable : bool, optional
+            option to start or stop watching. default to True
+        """
+        directories = self._watcher.directories()
+        if directories:
+            self._watcher.removePaths(directories)
+        self._candidates = {}
+        if enable:
+            self._watcher.addPath(self.filepath)
+            self._watch_timer.start()
+        else:
+            self._watch_timer.stop()
+
+    def _schedule_scan(self, path):
+        # let the writer go on, the file is probably not complete yet
+        QtCore.QTimer.singleShot(WATCH_INTERVAL // 5, self.scan_new_files)
+
+    def scan_new_files(self):
+        """append image files written to the directory since the last scan
+        """
+        try:
+            index = directory_index(self.filepath)
+        except OSError as e:
+            print("INFO: can't scan directory = {}: {}"
+                  .format(self.filepath, e))
+            return
+        fn_set = index.fn_set
+        candidates = {}
+        key_list = []
+        operation_list = []
+        for img_fn in index.names(self.img_data_ext):
+            key = os.path.splitext(img_fn)[0]
+            if key in self._known_keys:
+                continue
+            meta = img_fn
+            if self._int_fn_prefix is not None:
+                int_fn = ''.join([self._int_fn_prefix, key,
+                                  self.int_data_ext])
+                if int_fn not in fn_set:
+                    continue
+                meta = (img_fn, int_fn)
+            fn_list = [meta] if isinstance(meta, str) else meta
+            try:
+                stat = tuple((st.st_size, st.st_mtime) for st in
+                             (os.stat(os.path.join(self.filepath, fn))
+                              for fn in fn_list))
+            except OSError:
+                continue
+            if self._candidates.get(key) == stat and all(
+                    size for size, mtime in stat):
+                key_list.append(key)
+                operation_list.append(meta)
             else:
-                # always load img data
-                img_fn = meta
-            img_data_list.append(self.img_handler(os.path.join(self.filepath,
-                                                               img_fn)))
-        # file-based operation; always refresh
-        self.update(key_list, img_data_list, int_data_list, True)
+                candidates[key] = stat
+        self._candidates = candidates
+        if not key_list:
+            return
+        if not self._n_loaded and not self._pending:
+            # nothing shown yet, find out units and reduced data
+            self.set_path(refresh=True)
+            return
+        print("INFO: found {} new files in directory = {}"
+              .format(len(key_list), self.filepath))
+        self._known_keys.update(key_list)
+        self._load(key_list, operation_list, save_cache=False)
+
+    def export_stack(self, fn=None, compress=False):
+        """save the shown images and reduced data into a single file
+
+        Parameters
+        ----------
+        fn : str, optional
+            filename of the stack. default to asking for it
+        compress : bool, optional
+            option to compress the data. default to False
+        """
+        if not fn:
+            fn, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self, 'Export Stack', self.filepath, 'Stack (*.npz)')
+            if not fn:
+                return
+        if not self.viewer.key_list:
+            print("INFO: no data to export")
+            return
+        self.statusBar().showMessage("Exporting stack to {}".format(fn))
+        waterfall = self.waterfall
+        export_stack(fn, self.viewer.key_list, self.viewer.img_data_list,
+                     waterfall.key_list,
+                     list(zip(waterfall.x_array_list,
+                              waterfall.y_array_list)),
+                     waterfall.unit, compress=compress)
+        self.statusBar().showMessage("Exported stack to {}".format(fn), 3000)
+
+    def open_stack(self, fn=None):
+        """show a stack saved by export_stack, reading images lazily
+
+        Parameters
+        ----------
+        fn : str, optional
+            filename of the stack. default to asking for it
+        """
+        if not fn:
+            fn, _ = QtWidgets.QFileDialog.getOpenFileName(
+                self, 'Open Stack', self.filepath, 'Stack (*.npz)')
+            if not fn:
+                return
+        self.cancel_loading()
+        self.watch_cbox.setChecked(False)
+        key_list, img_data_list, int_key_list, int_data_list, unit = \
+            open_stack(fn)
+        self.waterfall.unit = unit
+        self._known_keys = set(key_list)
+        self._n_loaded = len(key_list)
+        if int_key_list == key_list:
+            self.update(key_list, img_data_list, int_data_list,
+                        refresh=True, follow=False)
+        else:
+            self.update(key_list, img_data_list, refresh=True, follow=False)
+            if int_data_list:
+                self.waterfall.update(int_key_list, int_data_list)
+                self.update_one_dim_plot(self.viewer.slider.val)
 
     def refresh(self):
         """method to reload files in current directory. it's basically a
@@ -221,17 +547,17 @@ class XpdView(QtWidgets.QMainWindow):
     def update_one_dim_plot(self, val):
         """method to display auxiliary 1d plot"""
         # obtain state from waterfall plot class
-        if self.waterfall.halt:
+        _val = int(round(val))
+        if _val >= len(self.waterfall.key_list):
             # no int_data_list passed to update -> turn 1D fig to black
-            self.waterfall.no_int_data_plot(self.int_ax, self.int_canvas)
+            self._default_plot(self.int_ax)
+            self.int_canvas.draw_idle()
             return
         else:
             # use the same rounding logic
-            _val = int(round(val))
-            int_data_list = self.waterfall.int_data_list
             key_list = self.waterfall.key_list
-            _array = int_data_list[_val]
-            x,y = _array
+            x = self.waterfall.x_array_list[_val]
+            y = self.waterfall.y_array_list[_val]
             self.int_ax.set_facecolor('w')
             self.int_ax.cla()
             xlabel, ylabel = self.waterfall.unit
@@ -267,6 +593,14 @@ class XpdView(QtWidgets.QMainWindow):
         refresh_path.setShortcut('Ctrl+R')
         refresh_path.triggered.connect(self.refresh)
 
+        # single file stacks
+        export_action = QtWidgets.QAction('&Export Stack', self)
+        export_action.setStatusTip("Save shown data into a single file")
+        export_action.triggered.connect(self.export_stack)
+        open_action = QtWidgets.QAction('Open S&tack', self)
+        open_action.setStatusTip("Show data saved with Export Stack")
+        open_action.triggered.connect(self.open_stack)
+
         # This creates the window redocking option in the code
         reset_windows = QtWidgets.QAction('&Redock Windows', self)
         reset_windows.triggered.connect(self.reset_window_layout)
@@ -276,6 +610,8 @@ class XpdView(QtWidgets.QMainWindow):
         filemenu = mainmenu.addMenu("&File")
         filemenu.addAction(setpath)
         filemenu.addAction(refresh_path)
+        filemenu.addAction(export_action)
+        filemenu.addAction(open_action)
         window_menu = mainmenu.addMenu("&Window")
         window_menu.addAction(reset_windows)
 
@@ -294,6 +630,11 @@ class XpdView(QtWidgets.QMainWindow):
         refresh_btn.clicked.connect(self.refresh)
         self.tools_box.addWidget(refresh_btn)
 
+        self.watch_cbox = QtWidgets.QCheckBox('Watch directory', self)
+        self.watch_cbox.setToolTip('Append new files as they are written')
+        self.watch_cbox.toggled.connect(self.watch)
+        self.tools_box.addWidget(self.watch_cbox)
+
         img_data_ext_label = QtWidgets.QLabel('2D image file extention')
         self.img_data_ext_cbox = QtWidgets.QComboBox()
         self.img_data_ext_cbox.addItem(".tif")
@@ -329,13 +670,19 @@ class XpdView(QtWidgets.QMainWindow):
         if self.img_data_ext_cbox.currentText() == '.tif':
             print("INFO: change 2d img data default extention to .tif")
             self.img_data_ext = '.tif'
-            self.img_handler = TIF_READER
+            if self.mmap_images:
+                self.img_handler = TIF_MMAP_READER
+            else:
+                self.img_handler = TIF_READER
             self.refresh()
 
         elif self.img_data_ext_cbox.currentText() == '.npy':
             print("INFO: change 2d img data default extention to .npy")
             self.img_data_ext = '.npy'
-            self.img_handler = NPY_READER
+            if self.mmap_images:
+                self.img_handler = NPY_MMAP_READER
+            else:
+                self.img_handler = NPY_READER
             self.refresh()
 
     def reset_window_layout(self):
@@ -2,6 +2,7 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
+from matplotlib.collections import LineCollection
 from cycler import cycler
 
 simonCycle2 = [
@@ -26,6 +27,187 @@ plt.rcParams["lines.linewidth"] = 2.0
 plt.rcParams["font.size"] = 14
 
 
+def minmax_decimate(x, y, factor):
+    """reduce curves to the minimum and maximum of every ``factor`` points
+
+    Extrema are kept in the order they occur, so peaks survive and the
+    envelope of the curve is unchanged. Trailing points which do not fill
+    a whole bin are kept as they are.
+
+    Parameters
+    ----------
+    x : ndarray
+        1D data grid, or an array with the same shape as ``y``
+    y : ndarray
+        1D data values, or 2D array with one curve per row
+    factor : int
+        number of points per bin
+
+    Returns
+    -------
+    x, y : ndarray
+        decimated data grid and values. ``x`` has the shape of ``y``
+        unless no decimation was done
+    """
+    if factor < 2 or y.shape[-1] < factor:
+        return x, y
+    n_bins = y.shape[-1] // factor
+    stop = n_bins * factor
+    binned = y[..., :stop].reshape(y.shape[:-1] + (n_bins, factor))
+    i_min = binned.argmin(axis=-1)
+    i_max = binned.argmax(axis=-1)
+    ind = np.stack((np.minimum(i_min, i_max), np.maximum(i_min, i_max)),
+                   axis=-1)
+    ind += np.arange(0, stop, factor)[:, None]
+    ind = ind.reshape(y.shape[:-1] + (2 * n_bins,))
+    tail = np.arange(stop, y.shape[-1])
+    ind = np.concatenate(
+        (ind, np.broadcast_to(tail, y.shape[:-1] + tail.shape)), axis=-1)
+    if x.ndim == 1:
+        x = x[ind]
+    else:
+        x = np.take_along_axis(x, ind, axis=-1)
+    return x, np.take_along_axis(y, ind, axis=-1)
+
+
+class CurveBuffer:
+    """growable store of 1D curves
+
+    Curves sharing the x grid of the first curve are kept as rows of one
+    preallocated 2D intensity array whose capacity doubles when full. As
+    soon as a curve with a different grid comes in, the buffer falls back
+    to lists of separate arrays.
+
+    Curves are addressed by their sequence number, the number of curves
+    appended before them. With a ``capacity`` the buffer is a ring: the
+    oldest curve is overwritten once it is full, so ``start`` moves on.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        maximum number of curves kept. default to None (unbounded)
+
+    Attributes
+    ----------
+    x_grid : ndarray or None
+        x grid shared by all curves, None if empty or not shared
+    start : int
+        sequence number of the oldest curve kept
+    stop : int
+        sequence number the next curve will get
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.x_grid = None
+        self._y = None
+        self._x_list = None
+        self._y_list = None
+        # (xmin, ymin, xmax, ymax) of each curve
+        self._extents = np.empty((0, 4))
+        self.start = 0
+        self.stop = 0
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def slot(self, i):
+        """storage row of curve ``i``"""
+        if self.capacity:
+            return i % self.capacity
+        return i
+
+    def index(self, slot):
+        """sequence number of the curve stored in ``slot``"""
+        return self.start + (slot - self.slot(self.start)) % max(len(self), 1)
+
+    def _slots(self, start, stop):
+        """slice or index array of storage rows of curves start to stop"""
+        if stop <= start:
+            return slice(0, 0)
+        first = self.slot(start)
+        if first + stop - start <= (self.capacity or stop):
+            return slice(first, first + stop - start)
+        return np.arange(start, stop) % self.capacity
+
+    def _grow(self, array):
+        """return ``array`` with room for one more row"""
+        if len(self) < len(array) or (self.capacity
+                                      and len(array) == self.capacity):
+            return array
+        size = max(2 * len(array), 16)
+        if self.capacity:
+            size = min(size, self.capacity)
+        buffer = np.empty((size,) + array.shape[1:], dtype=array.dtype)
+        buffer[: len(array)] = array
+        return buffer
+
+    def append(self, x, y):
+        """add a curve
+
+        Parameters
+        ----------
+        x : ndarray
+            data grid
+        y : ndarray
+            data values
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if not self.stop and self._x_list is None:
+            self.x_grid = np.array(x)
+            self._y = np.empty((0, len(y)), dtype=np.result_type(y, float))
+        elif self.x_grid is not None and not (
+            x is self.x_grid or np.array_equal(x, self.x_grid)
+        ):
+            self._x_list = [self.x_grid] * len(self)
+            self._y_list = list(self._y[:len(self)].copy())
+            self.x_grid = None
+            self._y = None
+
+        slot = self.slot(self.stop)
+        if self.x_grid is None:
+            if slot == len(self._y_list):
+                self._x_list.append(x)
+                self._y_list.append(y)
+            else:
+                self._x_list[slot] = x
+                self._y_list[slot] = y
+        else:
+            self._y = self._grow(self._y)
+            self._y[slot] = y
+        self._extents = self._grow(self._extents)
+        self._extents[slot] = x.min(), y.min(), x.max(), y.max()
+        self.stop += 1
+        if self.capacity and len(self) > self.capacity:
+            self.start += 1
+
+    def x(self, i):
+        """data grid of curve ``i``"""
+        if self.x_grid is not None:
+            return self.x_grid
+        return self._x_list[self.slot(i)]
+
+    def y(self, i):
+        """data values of curve ``i``"""
+        if self.x_grid is not None:
+            return self._y[self.slot(i)]
+        return self._y_list[self.slot(i)]
+
+    def y_block(self, start, stop):
+        """2D array of data values of curves ``start`` to ``stop``, only
+        available when the x grid is shared. This is a view unless the
+        curves wrap around the end of the ring"""
+        return self._y[self._slots(start, stop)]
+
+    def extents(self, start, stop):
+        """(xmin, ymin, xmax, ymax) of curves ``start`` to ``stop``"""
+        return self._extents[self._slots(start, stop)]
+
+    def clear(self):
+        self.__init__(self.capacity)
+
+
 class Waterfall:
     """class holds data and generate watefall plot
 
@@ -42,11 +224,20 @@ class Waterfall:
         format. default to None
     unit : tuple, optional
         a tuple containing strings of x and y labels
+    decimate : bool, optional
+        option to draw the min/max envelope of each curve at the
+        resolution of the canvas instead of every point. The envelope is
+        recomputed on zoom and resize. default to True
+    max_curves : int, optional
+        maximum number of curves kept. Once reached, the oldest curve is
+        dropped and its artist reused for the newest one, so memory and
+        cost per update stay constant. default to None (keep all)
     kwargs :
         keyword arguments for plotting
     """
 
-    def __init__(self, fig=None, canvas=None, *, unit=None, **kwargs):
+    def __init__(self, fig=None, canvas=None, *, unit=None, decimate=True,
+                 max_curves=None, **kwargs):
         if not fig:
             fig = plt.figure()
 
@@ -57,8 +248,7 @@ class Waterfall:
             canvas = self.fig.canvas
         self.canvas = canvas
         self.kwargs = kwargs
-        self.x_array_list = []
-        self.y_array_list = []
+        self._curves = CurveBuffer(max_curves)
 
         # callback for showing legend
         self.canvas.mpl_connect("pick_event", self.on_plot_hover)
@@ -66,9 +256,20 @@ class Waterfall:
         self.ax = self.fig.add_subplot(111)
         self.unit = unit
 
+        # pixels a curve spans on the canvas, used for decimation
+        self.decimate = decimate
+        self._lod = None
+        self._laying_out = False
+        self.ax.callbacks.connect("xlim_changed", self._on_view_changed)
+        self.canvas.mpl_connect("resize_event", self._on_view_changed)
+
         # add sliders, which store information
         self.ydist = 0
         self.xdist = 0
+        # (x_offset, y_offset, xdist, ydist, lod) of the last full layout
+        # and the sequence number of the next curve to place with it
+        self._layout = None
+        self._n_laid_out = 0
 
         y_offset_slider_ax = self.fig.add_axes([0.15, 0.95, 0.3, 0.035])
         self.y_offset_slider = Slider(
@@ -92,6 +293,18 @@ class Waterfall:
         )
         self.x_offset_slider.on_changed(self.update_x_offset)
 
+    @property
+    def x_array_list(self):
+        """list of data grids of all curves"""
+        return [self._curves.x(i)
+                for i in range(self._curves.start, self._curves.stop)]
+
+    @property
+    def y_array_list(self):
+        """list of data values of all curves"""
+        return [self._curves.y(i)
+                for i in range(self._curves.start, self._curves.stop)]
+
     def update(self, key_list, int_data_list):
         """top method to update information carried by class and plot
 
@@ -114,56 +327,143 @@ class Waterfall:
         for x, y in int_data_list:
             self.xdist = max(np.ptp(x), self.xdist)
             self.ydist = max(np.ptp(y), self.ydist)
-            self.x_array_list.append(x)
-            self.y_array_list.append(y)
+            self._curves.append(x, y)
+        if self._curves.capacity:
+            del self.key_list[: -self._curves.capacity]
 
     def _update_data(self):
         # draw if fresh axes
-        if len(self.x_array_list) != len(self.key_list):
+        if len(self._curves) != len(self.key_list):
             raise RuntimeError(
                 f"The keys must match the data! "
-                f"{len(self.x_array_list)}, "
+                f"{len(self._curves)}, "
                 f"{len(self.key_list):}"
             )
-        if not self.ax.lines:
-            for ind, el in enumerate(
-                zip(self.x_array_list, self.y_array_list, self.key_list)
-            ):
-                x, y, k = el
-                self.ax.plot(x, y, label=k, picker=5, **self.kwargs)
-        if len(self.ax.get_lines()) < len(self.y_array_list):
-            diff = len(self.y_array_list) - len(self.ax.get_lines())
-            for ind, el in enumerate(
-                zip(
-                    self.x_array_list[-diff:],
-                    self.y_array_list[-diff:],
-                    self.key_list[-diff:],
-                )
-            ):
-                x, y, k = el
-                self.ax.plot(x, y, label=k, picker=5, **self.kwargs)
+        self._add_artists()
+
+    def _add_artists(self):
+        """create artists for curves which are not plotted yet"""
+        for k in self.key_list[len(self.ax.get_lines()):]:
+            # data is set with offsets applied in _update_plot
+            self.ax.plot([], [], label=k, picker=5, **self.kwargs)
 
     def _update_plot(self):
-        """core method to update x-, y-offset sliders"""
-        x_offset_val = self.x_offset_slider.val
-        y_offset_val = self.y_offset_slider.val
+        """core method to update x-, y-offset sliders
 
-        # update matplotlib line data
-        lines = self.ax.get_lines()
-        for i, (l, x, y) in enumerate(
-            zip(lines, self.x_array_list, self.y_array_list)
-        ):
-            xx = x + self.xdist * i * x_offset_val
-            yy = y + self.ydist * i * y_offset_val
-            l.set_data(xx, yy)
-        self.ax.relim()
-        self.ax.autoscale_view()
+        Only newly appended curves are touched unless the offsets or the
+        running x/y ranges changed since the last call, in which case
+        every curve is laid out again.
+        """
+        self._laying_out = True
+        # autoscaling may change the level of detail, lay out once more
+        for _ in range(2):
+            layout = (self.x_offset_slider.val, self.y_offset_slider.val,
+                      self.xdist, self.ydist, self._lod)
+            if layout != self._layout:
+                self._layout = layout
+                self._n_laid_out = 0
+            self._set_curve_data(max(self._n_laid_out, self._curves.start))
+            self._n_laid_out = self._curves.stop
+            self._update_limits()
+            self.ax.autoscale_view()
+            lod = self._level_of_detail()
+            if lod == self._lod:
+                break
+            self._lod = lod
+        self._laying_out = False
         if self.unit:
             xlabel, ylabel = self.unit
             self.ax.set_xlabel(xlabel)
             self.ax.set_ylabel(ylabel)
         self.canvas.draw_idle()
 
+    def _offsets(self, start, stop):
+        """x and y offsets of curves ``start`` to ``stop``"""
+        ind = np.arange(start, stop)
+        return (self.xdist * self.x_offset_slider.val * ind,
+                self.ydist * self.y_offset_slider.val * ind)
+
+    def _set_curve_data(self, start):
+        """apply offsets to curves from ``start`` on
+
+        Parameters
+        ----------
+        start : int
+            sequence number of the first curve to update. The oldest
+            curve kept means a full re-layout
+        """
+        x, y = self._offset_curves(start, self._curves.stop)
+        lines = self.ax.get_lines()
+        for i, xx, yy in zip(range(start, self._curves.stop), x, y):
+            line = lines[self._curves.slot(i)]
+            line.set_data(xx, yy)
+            line.set_label(self.key_list[i - self._curves.start])
+
+    def _update_limits(self):
+        """set data limits from the extents of the offset curves"""
+        if not len(self._curves):
+            return
+        start, stop = self._curves.start, self._curves.stop
+        extents = self._curves.extents(start, stop)
+        x_offsets, y_offsets = self._offsets(start, stop)
+        self.ax.ignore_existing_data_limits = True
+        self.ax.update_datalim([
+            (np.min(extents[:, 0] + x_offsets),
+             np.min(extents[:, 1] + y_offsets)),
+            (np.max(extents[:, 2] + x_offsets),
+             np.max(extents[:, 3] + y_offsets)),
+        ])
+
+    def _offset_curves(self, start, stop):
+        """curves ``start`` to ``stop`` with offsets applied
+
+        Returns
+        -------
+        x, y : ndarray or list
+            2D arrays with one curve per row if the x grid is shared,
+            otherwise lists of 1D arrays
+        """
+        x_offsets, y_offsets = self._offsets(start, stop)
+        if self._curves.x_grid is not None:
+            x, y = self._decimate(self._curves.x_grid,
+                                  self._curves.y_block(start, stop))
+            x = x + x_offsets[:, None]
+            y = y + y_offsets[:, None]
+        else:
+            x = []
+            y = []
+            for i, xo, yo in zip(range(start, stop), x_offsets, y_offsets):
+                xx, yy = self._decimate(self._curves.x(i), self._curves.y(i))
+                x.append(xx + xo)
+                y.append(yy + yo)
+        return x, y
+
+    def _decimate(self, x, y):
+        """min/max envelope of curves at the current level of detail"""
+        if not self._lod:
+            return x, y
+        return minmax_decimate(x, y, len(x) // self._lod)
+
+    def _level_of_detail(self):
+        """number of pixels one curve spans, rounded up to a power of 2,
+        or None if curves are not decimated"""
+        if not self.decimate or not self.xdist:
+            return None
+        x_lo, x_hi = self.ax.get_xlim()
+        if x_lo == x_hi:
+            return None
+        pixels = self.ax.bbox.width * self.xdist / abs(x_hi - x_lo)
+        return 2 ** int(np.ceil(np.log2(max(pixels, 1.))))
+
+    def _on_view_changed(self, event):
+        """callback to redo the decimation on zoom, pan and resize"""
+        if self._laying_out or not len(self._curves):
+            return
+        lod = self._level_of_detail()
+        if lod != self._lod:
+            self._lod = lod
+            self._update_plot()
+
     def update_y_offset(self, val):
         self._update_plot()
 
@@ -181,7 +481,102 @@ class Waterfall:
 
     def clear(self):
         self.key_list.clear()
-        self.x_array_list.clear()
-        self.y_array_list.clear()
+        self._curves.clear()
         self.ax.lines.clear()
+        self._layout = None
+        self._n_laid_out = 0
+        self._lod = None
+        self.canvas.draw_idle()
+
+
+class CollectionWaterfall(Waterfall):
+    """waterfall plot which draws curves with chunked ``LineCollection``
+
+    Drawing one collection of many curves is much cheaper than drawing
+    the same number of ``Line2D`` artists, which makes this class suited
+    for runs with thousands of patterns.
+
+    Parameters
+    ----------
+    fig : matplotlib.Figure
+        fig this waterfall plot will be drawn on
+    canvas : matplotlib.Canvas
+        canvas this waterfall plot will be drawn on
+    unit : tuple, optional
+        a tuple containing strings of x and y labels
+    decimate : bool, optional
+        option to draw the min/max envelope of each curve at the
+        resolution of the canvas. default to True
+    max_curves : int, optional
+        maximum number of curves kept. default to None (keep all)
+    chunk_size : int, optional
+        number of curves held by each collection. Appending a curve only
+        rebuilds the last collection. default to 500
+    kwargs :
+        keyword arguments for ``LineCollection``
+    """
+
+    def __init__(self, fig=None, canvas=None, *, unit=None, decimate=True,
+                 max_curves=None, chunk_size=500, **kwargs):
+        self.chunk_size = chunk_size
+        self._collections = []
+        # offset curves of each collection
+        self._segments = []
+        super().__init__(fig, canvas, unit=unit, decimate=decimate,
+                         max_curves=max_curves, **kwargs)
+
+    def _add_artists(self):
+        n_chunks = -(-len(self._curves) // self.chunk_size)
+        colors = [c["color"] for c in mpl.rcParams["axes.prop_cycle"]]
+        while len(self._collections) < n_chunks:
+            # keep the color of a curve independent of its chunk
+            shift = len(self._collections) * self.chunk_size % len(colors)
+            coll = LineCollection([], colors=colors[shift:] + colors[:shift],
+                                  picker=5, **self.kwargs)
+            self.ax.add_collection(coll, autolim=False)
+            self._collections.append(coll)
+            self._segments.append([])
+
+    def _set_curve_data(self, start):
+        stop = self._curves.stop
+        if start <= self._curves.start:
+            n = len(self._curves)
+            self._segments = [
+                [None] * min(self.chunk_size, n - chunk * self.chunk_size)
+                for chunk in range(len(self._collections))
+            ]
+        if start == stop:
+            return
+        x, y = self._offset_curves(start, stop)
+        if isinstance(y, np.ndarray):
+            segments = np.stack((x, y), axis=-1)
+        else:
+            segments = [np.column_stack(xy) for xy in zip(x, y)]
+        chunks = set()
+        for i, seg in zip(range(start, stop), segments):
+            chunk, j = divmod(self._curves.slot(i), self.chunk_size)
+            if j < len(self._segments[chunk]):
+                self._segments[chunk][j] = seg
+            else:
+                self._segments[chunk].append(seg)
+            chunks.add(chunk)
+        for chunk in chunks:
+            self._collections[chunk].set_segments(self._segments[chunk])
+
+    def on_plot_hover(self, event):
+        """callback to show legend when click on one of curves"""
+        coll = event.artist
+        if coll not in self._collections:
+            return
+        slot = self._collections.index(coll) * self.chunk_size + event.ind[0]
+        ind = self._curves.index(slot) - self._curves.start
+        self.ax.legend([coll], [self.key_list[ind]], handlelength=0,
+                       handletextpad=0, fancybox=True)
         self.canvas.draw_idle()
+
+    def clear(self):
+        for coll in self._collections:
+            coll.remove()
+        self._collections.clear()
+        self._segments.clear()
+        super().clear()